@@ -1,5 +1,6 @@
 from typing import List
 from fastapi import APIRouter, Depends, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from services.jobs_service import JobsService
 from schemas import analyzer_schema
@@ -8,37 +9,41 @@ from services.analyzers_service import (
     AnalyzerService,
 )
 
-from db.database import get_db
+from db.database import get_async_db, get_db
 
 router = APIRouter(prefix="/api/v1/analyzers")
 
 
 @router.get("/", operation_id="get-all-analyzers")
 async def get_all_analyzers(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> List[analyzer_schema.AnalyzerSimplifiedResponse]:
-    return AnalyzerService.get_all_analyzers(db)
+    return await db.run_sync(AnalyzerService.get_all_analyzers)
 
 
 @router.get("/{analyzer_id}", operation_id="get-analyzer")
 async def get_analyzer(
-    analyzer_id: int, db: Session = Depends(get_db)
+    analyzer_id: int, db: AsyncSession = Depends(get_async_db)
 ) -> analyzer_schema.AnalyzerSimplifiedResponse:
-    return AnalyzerService.get_analyzer(db, analyzer_id)
+    return await db.run_sync(AnalyzerService.get_analyzer, analyzer_id)
 
 
 @router.get("/{analyzer_id}/inputs", operation_id="get-analyzer-inputs")
 async def get_analyzer_inputs(
-    analyzer_id: int, db=Depends(get_db)
+    analyzer_id: int, db=Depends(get_async_db)
 ) -> List[analyzer_schema.AnalyzerInputResponse]:
-    return AnalyzerService.get_analyzer_inputs(db, analyzer_id=analyzer_id)
+    return await db.run_sync(
+        AnalyzerService.get_analyzer_inputs, analyzer_id=analyzer_id
+    )
 
 
 @router.get("/{analyzer_id}/outputs", operation_id="get-analyzer-outputs")
 async def get_analyzer_outputs(
-    analyzer_id: int, db=Depends(get_db)
+    analyzer_id: int, db=Depends(get_async_db)
 ) -> List[analyzer_schema.AnalyzerOutputResponse]:
-    return AnalyzerService.get_analyzer_outputs(db, analyzer_id=analyzer_id)
+    return await db.run_sync(
+        AnalyzerService.get_analyzer_outputs, analyzer_id=analyzer_id
+    )
 
 
 @router.post("/", operation_id="post-analyzer")
@@ -88,17 +93,17 @@ async def delete_analyzer_script(
 @router.get("/{analyzer_id}/script", operation_id="get-analyzer-script")
 async def get_analyzer_script(
     analyzer_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> str:
-    return AnalyzerService.get_script(db=db, analyzer_id=analyzer_id)
+    return await db.run_sync(AnalyzerService.get_script, analyzer_id=analyzer_id)
 
 
 @router.get("/{analyzer_id}/requirements", operation_id="get-analyzer-requirements")
 async def get_analyzer_requirements(
     analyzer_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> str:
-    return AnalyzerService.get_requirements(db=db, analyzer_id=analyzer_id)
+    return await db.run_sync(AnalyzerService.get_requirements, analyzer_id=analyzer_id)
 
 
 @router.post(
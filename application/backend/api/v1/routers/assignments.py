@@ -5,7 +5,7 @@ from schemas import batch_schema
 from services.batch_service import BatchService
 from schemas import reports_schema, project_schema, analyzer_schema
 
-from db.database import get_db
+from db.database import get_async_db, get_db
 from schemas import assingment_schema
 from services.assignments_service import AssignmentService
 
@@ -14,31 +14,31 @@ router = APIRouter(prefix="/api/v1/assignments")
 
 @router.get("/", operation_id="get-all-assignments")
 async def get_all_assignments(
-    db=Depends(get_db),
+    db=Depends(get_async_db),
 ) -> List[assingment_schema.AssignmentResponse]:
-    return AssignmentService.get_assignments(db)
+    return await db.run_sync(AssignmentService.get_assignments)
 
 
 @router.get("/{assignment_id}", operation_id="get-assignment")
 async def get_assignment(
     assignment_id: int,
-    db=Depends(get_db),
+    db=Depends(get_async_db),
 ) -> assingment_schema.AssignmentResponse:
-    return AssignmentService.get_assignment(db, assignment_id)
+    return await db.run_sync(AssignmentService.get_assignment, assignment_id)
 
 
 @router.get("/{assignment_id}/projects", operation_id="get-assignment-projects")
 async def get_assignment_projects(
-    assignment_id: int, db=Depends(get_db)
+    assignment_id: int, db=Depends(get_async_db)
 ) -> List[project_schema.ProjectResponse]:
-    return AssignmentService.get_assignment_projects(db, assignment_id)
+    return await db.run_sync(AssignmentService.get_assignment_projects, assignment_id)
 
 
 @router.get("/{assignment_id}/metadata", operation_id="get-assignment-metadata")
 async def get_assignment_metadata(
-    assignment_id: int, db=Depends(get_db)
+    assignment_id: int, db=Depends(get_async_db)
 ) -> List[assingment_schema.AssignmentMetadataResponse]:
-    return AssignmentService.get_assignment_metadata(db, assignment_id)
+    return await db.run_sync(AssignmentService.get_assignment_metadata, assignment_id)
 
 
 @router.post("/")
@@ -52,11 +52,13 @@ def create_assignment(
     "/{assignment_id}/teams/{team_id}/projects/reports",
     operation_id="get-assignment-projects-reports",
 )
-def get_assignment_team_projects_reports(
-    assignment_id: int, team_id: int, db=Depends(get_db)
+async def get_assignment_team_projects_reports(
+    assignment_id: int, team_id: int, db=Depends(get_async_db)
 ) -> List[reports_schema.ReportResponse]:
-    return AssignmentService.get_assignment_team_projects_reports(
-        db=db, assignment_id=assignment_id, team_id=team_id
+    return await db.run_sync(
+        AssignmentService.get_assignment_team_projects_reports,
+        assignment_id=assignment_id,
+        team_id=team_id,
     )
 
 
@@ -64,21 +66,24 @@ def get_assignment_team_projects_reports(
     "/{assignment_id}/teams/{team_id}/projects/reports/batch/{batch_id}",
     operation_id="get-assignment-projects-reports-batch",
 )
-def get_assignment_team_projects_report_batch(
-    assignment_id: int, team_id: int, batch_id: int, db=Depends(get_db)
+async def get_assignment_team_projects_report_batch(
+    assignment_id: int, team_id: int, batch_id: int, db=Depends(get_async_db)
 ) -> reports_schema.ReportResponse:
 
-    return BatchService.get_assignment_team_projects_reports_batch(
-        db=db, assignment_id=assignment_id, team_id=team_id, batch_id=batch_id
+    return await db.run_sync(
+        BatchService.get_assignment_team_projects_reports_batch,
+        assignment_id=assignment_id,
+        team_id=team_id,
+        batch_id=batch_id,
     )
 
 
 @router.get("/{assignment_id}/analyzers", operation_id="get-assignment-analyzers")
-def get_assignment_analyzers(
-    assignment_id: int, db=Depends(get_db)
+async def get_assignment_analyzers(
+    assignment_id: int, db=Depends(get_async_db)
 ) -> List[analyzer_schema.AnalyzerSimplifiedResponse]:
-    return AssignmentService.get_assignment_analyzers(
-        db=db, assignment_id=assignment_id
+    return await db.run_sync(
+        AssignmentService.get_assignment_analyzers, assignment_id=assignment_id
     )
 
 
@@ -86,11 +91,13 @@ def get_assignment_analyzers(
     "/{assignment_id}/analyzers/{analyzer_id}/batches",
     operation_id="get-assignment-analyzers-batches",
 )
-def get_assignment_analyzer_batches(
-    assignment_id: int, analyzer_id: int, db=Depends(get_db)
+async def get_assignment_analyzer_batches(
+    assignment_id: int, analyzer_id: int, db=Depends(get_async_db)
 ) -> List[batch_schema.BatchResponse]:
-    return BatchService.get_assignment_analyzers_batches(
-        db=db, assignment_id=assignment_id, analyzer_id=analyzer_id
+    return await db.run_sync(
+        BatchService.get_assignment_analyzers_batches,
+        assignment_id=assignment_id,
+        analyzer_id=analyzer_id,
     )
 
 
@@ -98,11 +105,13 @@ def get_assignment_analyzer_batches(
     "/{assignment_id}/analyzers/{analyzer_id}/batches/latest/reports",
     operation_id="get-assignment-analyzers-batches-latest-reports",
 )
-def get_assignment_analyzer_batches_latest_reports(
-    assignment_id: int, analyzer_id: int, db=Depends(get_db)
+async def get_assignment_analyzer_batches_latest_reports(
+    assignment_id: int, analyzer_id: int, db=Depends(get_async_db)
 ) -> List[reports_schema.ReportTeamResponse]:
-    return BatchService.get_assignment_analyzers_batches_latest_reports(
-        db=db, assignment_id=assignment_id, analyzer_id=analyzer_id
+    return await db.run_sync(
+        BatchService.get_assignment_analyzers_batches_latest_reports,
+        assignment_id=assignment_id,
+        analyzer_id=analyzer_id,
     )
 
 
@@ -2,23 +2,58 @@ from typing import List
 from fastapi import APIRouter, Depends
 from services.batch_service import BatchService
 
-from db.database import get_db
+from db.database import get_async_db, get_db
 
-from schemas.batch_schema import BatchResponse, BatchStatsResponse
+from schemas.batch_schema import (
+    BatchResponse,
+    BatchProgressResponse,
+    BatchStatsResponse,
+    ExecutionLogResponse,
+)
 
 router = APIRouter(prefix="/api/v1/batches")
 
 
 @router.get("/", operation_id="get-all-batches")
-async def get_batches(db=Depends(get_db)) -> List[BatchResponse]:
-    pass
+async def get_batches(db=Depends(get_async_db)) -> List[BatchResponse]:
+    return await db.run_sync(BatchService.get_batches)
 
 
 @router.get("/{batch_id}", operation_id="get-batch")
-async def get_batch(batch_id: int, db=Depends(get_db)) -> BatchResponse:
-    pass
+async def get_batch(batch_id: int, db=Depends(get_async_db)) -> BatchResponse:
+    return await db.run_sync(BatchService.get_batch, batch_id=batch_id)
 
 
 @router.get("/{batch_id}/stats", operation_id="get-batch-stats")
-async def get_batch_stats(batch_id: int, db=Depends(get_db)) -> BatchStatsResponse:
-    return BatchService.get_batch_stats(db=db, batch_id=batch_id)
+async def get_batch_stats(
+    batch_id: int, db=Depends(get_async_db)
+) -> BatchStatsResponse:
+    return await db.run_sync(BatchService.get_batch_stats, batch_id=batch_id)
+
+
+@router.post("/{batch_id}/cancel", operation_id="cancel-batch")
+async def cancel_batch(batch_id: int, db=Depends(get_db)) -> BatchResponse:
+    return BatchService.cancel_batch(db=db, batch_id=batch_id)
+
+
+@router.post("/{batch_id}/retry-failed", operation_id="retry-failed-batch-projects")
+async def retry_failed(batch_id: int, db=Depends(get_db)) -> BatchResponse:
+    return BatchService.retry_failed(db=db, batch_id=batch_id)
+
+
+@router.get(
+    "/{batch_id}/projects/{project_id}/logs", operation_id="get-execution-logs"
+)
+async def get_execution_logs(
+    batch_id: int, project_id: int, db=Depends(get_async_db)
+) -> ExecutionLogResponse:
+    return await db.run_sync(
+        BatchService.get_execution_logs, batch_id=batch_id, project_id=project_id
+    )
+
+
+@router.get("/{batch_id}/progress", operation_id="get-batch-progress")
+async def get_batch_progress(
+    batch_id: int, db=Depends(get_async_db)
+) -> BatchProgressResponse:
+    return await db.run_sync(BatchService.get_batch_progress, batch_id=batch_id)
@@ -3,15 +3,15 @@ from fastapi import APIRouter, Depends
 from schemas import course_schema, assingment_schema, team_schema
 
 from services.courses_service import CourseService
-from db.database import get_db
+from db.database import get_async_db, get_db
 
 
 router = APIRouter(prefix="/api/v1/courses")
 
 
 @router.get("/", operation_id="get-all-courses")
-async def get_courses(db=Depends(get_db)) -> List[course_schema.CourseResponse]:
-    return CourseService.get_courses(db=db)
+async def get_courses(db=Depends(get_async_db)) -> List[course_schema.CourseResponse]:
+    return await db.run_sync(CourseService.get_courses)
 
 
 @router.post("/", operation_id="post-course")
@@ -28,9 +28,9 @@ async def put_course(
 
 @router.get("/{course_id}", operation_id="get-course")
 async def get_course(
-    course_id: int, db=Depends(get_db)
+    course_id: int, db=Depends(get_async_db)
 ) -> course_schema.CourseResponse:
-    return CourseService.get_course(db, course_id)
+    return await db.run_sync(CourseService.get_course, course_id)
 
 
 @router.delete("/{course_id}", operation_id="delete-course")
@@ -42,13 +42,13 @@ async def delete_course(
 
 @router.get("/{course_id}/assignments/", operation_id="get-course-assignments")
 async def get_course_assignments(
-    course_id: int, db=Depends(get_db)
+    course_id: int, db=Depends(get_async_db)
 ) -> List[assingment_schema.AssignmentResponse]:
-    return CourseService.get_course_assingments(db, course_id)
+    return await db.run_sync(CourseService.get_course_assingments, course_id)
 
 
 @router.get("/{course_id}/teams/", operation_id="get-course-teams")
 async def get_courses_teams(
-    course_id: int, db=Depends(get_db)
+    course_id: int, db=Depends(get_async_db)
 ) -> List[team_schema.TeamResponse]:
-    return CourseService.get_course_teams(db, course_id)
+    return await db.run_sync(CourseService.get_course_teams, course_id)
@@ -12,10 +12,24 @@ from db.database import get_db
 router = APIRouter(prefix="/api/v1/jobs")
 
 
+@router.get("/queues", operation_id="get-queue-stats")
+async def get_queue_stats(
+    db: Session = Depends(get_db),
+) -> List[job_schema.QueueStatsResponse]:
+    return JobsService.get_queue_stats(db)
+
+
 @router.post("/{analyzer}", operation_id="run-job")
 async def run_job(
     data: job_schema.JobCreate,
     analyzer: int,
     db: Session = Depends(get_db),
 ) -> batch_schema.BatchResponse:
-    return JobsService.run_job(db, analyzer, data.assignment_id, data.project_ids)
+    return JobsService.run_job(
+        db,
+        analyzer,
+        data.assignment_id,
+        data.project_ids,
+        force=data.force,
+        interactive=data.interactive,
+    )
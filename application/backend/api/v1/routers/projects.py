@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends
 from schemas import reports_schema, project_schema
 
 from services.projects_service import ProjectsService
-from db.database import get_db
+from db.database import get_async_db
 
 
 router = APIRouter(prefix="/api/v1/projects")
@@ -11,20 +11,20 @@ router = APIRouter(prefix="/api/v1/projects")
 
 @router.get("/", operation_id="get-all-projects")
 async def get_all_teams(
-    db=Depends(get_db),
+    db=Depends(get_async_db),
 ) -> List[project_schema.ProjectResponse]:
-    return ProjectsService.get_all_projects(db)
+    return await db.run_sync(ProjectsService.get_all_projects)
 
 
 @router.get("/{project_id}", operation_id="get-project")
 async def get_all_teams(
-    project_id: int, db=Depends(get_db)
+    project_id: int, db=Depends(get_async_db)
 ) -> project_schema.ProjectResponse:
-    return ProjectsService.get_project(db, project_id)
+    return await db.run_sync(ProjectsService.get_project, project_id)
 
 
 @router.get("/{project_id}/reports", operation_id="get-project-reports")
 async def get_all_teams(
-    project_id: int, db=Depends(get_db)
+    project_id: int, db=Depends(get_async_db)
 ) -> List[reports_schema.ReportResponse]:
-    return ProjectsService.get_project_reports(db, project_id=project_id)
+    return await db.run_sync(ProjectsService.get_project_reports, project_id=project_id)
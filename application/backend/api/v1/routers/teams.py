@@ -3,26 +3,26 @@ from fastapi import APIRouter, Depends
 from schemas import team_schema, project_schema
 
 from services.teams_service import TeamService
-from db.database import get_db
+from db.database import get_async_db
 
 
 router = APIRouter(prefix="/api/v1/teams")
 
 
 @router.get("/", operation_id="get-all-teams")
-async def get_all_teams(db=Depends(get_db)) -> List[team_schema.TeamResponse]:
-    return TeamService.get_all_teams(db)
+async def get_all_teams(db=Depends(get_async_db)) -> List[team_schema.TeamResponse]:
+    return await db.run_sync(TeamService.get_all_teams)
 
 
 @router.get("/{team_id}", operation_id="get-team")
 async def get_all_teams(
-    team_id: int, db=Depends(get_db)
+    team_id: int, db=Depends(get_async_db)
 ) -> List[team_schema.TeamResponse]:
-    return TeamService.get_team(db, team_id)
+    return await db.run_sync(TeamService.get_team, team_id)
 
 
 @router.get("/{team_id}/projects", operation_id="get-team-projects")
 async def get_all_teams(
-    team_id: int, db=Depends(get_db)
+    team_id: int, db=Depends(get_async_db)
 ) -> List[team_schema.TeamResponse]:
-    return TeamService.get_team_projects(db, team_id)
+    return await db.run_sync(TeamService.get_team_projects, team_id)
@@ -0,0 +1,98 @@
+"""
+Compares the sync and async db dependencies of the api under mixed load:
+slow requests running a query of SLOW_QUERY_SECONDS next to fast course
+listings, all sent at once. With the sync session every query blocks the
+event loop, so the fast requests wait behind the slow ones.
+
+Each round stays below the default pool size of the sync engine, as
+requests hold their connection until the response is sent.
+
+Run from application/backend with a seeded db:
+
+    python -m benchmarks.async_db
+"""
+
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+
+from db.database import async_engine, get_async_db, get_db
+from services.courses_service import CourseService
+
+ROUNDS = 10
+SLOW_REQUESTS = 4
+FAST_REQUESTS = 10
+SLOW_QUERY_SECONDS = 0.2
+
+
+def slow_query(db):
+    db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": SLOW_QUERY_SECONDS})
+
+
+app = FastAPI()
+
+
+@app.get("/sync/slow")
+async def sync_slow(db=Depends(get_db)):
+    slow_query(db)
+
+
+@app.get("/sync/fast")
+async def sync_fast(db=Depends(get_db)):
+    return CourseService.get_courses(db)
+
+
+@app.get("/async/slow")
+async def async_slow(db=Depends(get_async_db)):
+    await db.run_sync(slow_query)
+
+
+@app.get("/async/fast")
+async def async_fast(db=Depends(get_async_db)):
+    return await db.run_sync(CourseService.get_courses)
+
+
+async def timed_get(client: httpx.AsyncClient, url: str) -> float:
+    started = time.perf_counter()
+    response = await client.get(url)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def run_mode(client: httpx.AsyncClient, mode: str):
+    started = time.perf_counter()
+    fast_latencies = []
+    for _ in range(ROUNDS):
+        slow = [timed_get(client, f"/{mode}/slow") for _ in range(SLOW_REQUESTS)]
+        fast = [timed_get(client, f"/{mode}/fast") for _ in range(FAST_REQUESTS)]
+        results = await asyncio.gather(*slow, *fast)
+        fast_latencies.extend(results[SLOW_REQUESTS:])
+    total = time.perf_counter() - started
+
+    fast_latencies.sort()
+    print(
+        f"{mode:>5}: total {total:6.2f}s, "
+        f"fast p50 {statistics.median(fast_latencies) * 1000:7.1f}ms, "
+        f"fast p95 {fast_latencies[int(len(fast_latencies) * 0.95) - 1] * 1000:7.1f}ms"
+    )
+
+
+async def main():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # warm up both connection pools
+        await client.get("/sync/fast")
+        await client.get("/async/fast")
+
+        for mode in ["sync", "async"]:
+            await run_mode(client, mode)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
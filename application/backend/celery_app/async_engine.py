@@ -0,0 +1,255 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from aiodocker import Docker
+from aiodocker.containers import DockerContainer
+from aiodocker.exceptions import DockerError
+
+from celery_app.helpers import (
+    AsyncReportWriter,
+    JsonlResults,
+    is_transient,
+    jsonl_exec,
+    process_outcome,
+    project_exec,
+    retry_backoff,
+)
+from configs.config import settings
+from db.crud.executions_crud import ExecutionsRepository
+from db.database import AsyncSessionLocal, async_engine
+from schemas.shared import AnalyzerProtocolEnum
+from utils.dockerUtils import ExecOutput, OutputCapture, make_archive
+from utils.validationUtils import OutputValidator
+
+
+async def mark_running(batch_id: int, project_id: int, started_at: datetime):
+    async with AsyncSessionLocal() as session:
+        await session.run_sync(
+            lambda db: ExecutionsRepository.mark_running(
+                db, batch_id, project_id, started_at
+            )
+        )
+
+
+async def run_exec(
+    container: DockerContainer,
+    command: List[str],
+    environment: Dict,
+    on_line: Optional[Callable[[bytes], Awaitable[None]]] = None,
+) -> ExecOutput:
+    """
+    Async counterpart of dockerUtils.capture_exec, without blocking the event loop.
+    """
+    started = time.monotonic()
+    execution = await container.exec(
+        command, stdout=True, stderr=True, environment=environment
+    )
+
+    stdout, stderr = OutputCapture(), OutputCapture()
+    async with execution.start(detach=False) as stream:
+        while (message := await stream.read_out()) is not None:
+            if message.stream != 1:
+                stderr.feed(message.data)
+                continue
+
+            for line in stdout.feed(message.data):
+                if on_line:
+                    await on_line(line)
+    for line in stdout.close():
+        if on_line:
+            await on_line(line)
+    stderr.close()
+
+    return ExecOutput(
+        (await execution.inspect())["ExitCode"],
+        stdout.output,
+        stdout.content,
+        stderr.content,
+        time.monotonic() - started,
+    )
+
+
+async def execute_project(
+    container: DockerContainer,
+    semaphore: asyncio.Semaphore,
+    script_command: str,
+    metadata: Dict,
+    batch_id: int,
+    project_id: int,
+    timeout: int,
+    cancelled: threading.Event,
+):
+    """
+    Async counterpart of tasks.execute_project, waiting for a free slot on
+    the semaphore before starting the exec.
+    """
+    async with semaphore:
+        if cancelled.is_set():
+            return []
+
+        started_at = datetime.now()
+        await mark_running(batch_id, project_id, started_at)
+
+        command, environment = project_exec(script_command, metadata, timeout)
+
+        for attempt in range(settings.ANALYZER_TRANSIENT_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(retry_backoff(attempt))
+                if cancelled.is_set():
+                    return []
+
+            try:
+                result, error = await run_exec(container, command, environment), None
+            except DockerError as e:
+                result, error = None, str(e)
+
+            if not is_transient(result, error):
+                break
+
+        return [(project_id, started_at, result, error)]
+
+
+async def execute_projects_jsonl(
+    container: DockerContainer,
+    semaphore: asyncio.Semaphore,
+    script_command: str,
+    projects: Dict[int, Dict],
+    batch_id: int,
+    timeout: int,
+    cancelled: threading.Event,
+):
+    """
+    Async counterpart of tasks.execute_projects_jsonl.
+    """
+    async with semaphore:
+        if cancelled.is_set():
+            return []
+
+        results = JsonlResults(projects)
+        inputs_name, command, environment = jsonl_exec(
+            script_command, len(projects), timeout
+        )
+        await container.put_archive("/tmp", make_archive(inputs_name, results.input()))
+
+        await mark_running(batch_id, results.pending[0], results.started_at)
+
+        async def on_line(line: bytes):
+            next_project_id = results.add_line(line)
+            if next_project_id is not None:
+                await mark_running(batch_id, next_project_id, results.started_at)
+
+        error = None
+        try:
+            run = await run_exec(container, command, environment, on_line)
+        except DockerError as e:
+            run, error = ExecOutput(None, b""), str(e)
+
+        if cancelled.is_set():
+            return results.outcomes
+
+        # projects the script never answered for, they get the stderr of the run
+        return results.finish(run, error, timeout * len(projects))
+
+
+async def run_projects_async(
+    container_id: str,
+    script_command: str,
+    projects_with_metadata: Dict[int, Dict],
+    batch_id: int,
+    protocol: Optional[AnalyzerProtocolEnum],
+    concurrency: int,
+    timeout: int,
+    validator: OutputValidator,
+    cache_keys: Dict[int, str],
+    cancelled: threading.Event,
+) -> bool:
+    """
+    Asyncio engine: runs the projects of a chunk in the container from one
+    event loop, with at most `concurrency` execs at a time, and stores their
+    reports and execution outcomes through an async session.
+    Returns True if any project failed.
+    """
+    errors = False
+    semaphore = asyncio.Semaphore(concurrency)
+
+    try:
+        async with Docker() as docker, AsyncSessionLocal() as session:
+            container = docker.containers.container(container_id)
+
+            if protocol == AnalyzerProtocolEnum.jsonl:
+                project_items = list(projects_with_metadata.items())
+                executions = [
+                    execute_projects_jsonl(
+                        container,
+                        semaphore,
+                        script_command,
+                        dict(project_items[i::concurrency]),
+                        batch_id,
+                        timeout,
+                        cancelled,
+                    )
+                    for i in range(min(concurrency, len(project_items)))
+                ]
+            else:
+                executions = [
+                    execute_project(
+                        container,
+                        semaphore,
+                        script_command,
+                        metadata,
+                        batch_id,
+                        project_id,
+                        timeout,
+                        cancelled,
+                    )
+                    for project_id, metadata in projects_with_metadata.items()
+                ]
+
+            # the writer flushes on exit, also when an execution raised
+            async with AsyncReportWriter(session) as writer:
+                pending = {asyncio.ensure_future(e) for e in executions}
+                while pending:
+                    # wakes up at least every flush interval, so outcomes of
+                    # finished execs are written while slow ones still run
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=writer.max_interval,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        for project_id, started_at, result, error in task.result():
+                            processed = process_outcome(
+                                project_id,
+                                result,
+                                error,
+                                batch_id,
+                                validator,
+                                timeout,
+                                cache_keys,
+                                cancelled,
+                            )
+                            if processed is None:
+                                continue
+
+                            report, error = processed
+                            if report:
+                                await writer.add_report(report)
+                            await writer.add_execution(
+                                batch_id,
+                                project_id,
+                                started_at,
+                                error=error,
+                                output=result,
+                            )
+                            if error:
+                                errors = True
+
+                    await writer.flush_if_due()
+    finally:
+        # the pooled connections belong to this event loop
+        await async_engine.dispose()
+
+    return errors
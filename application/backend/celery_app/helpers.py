@@ -1,13 +1,80 @@
-from services.analyzers_service import AnalyzerService
-from services.projects_service import ProjectsService
-from services.assignments_service import AssignmentService
+import hashlib
+import json
+import shlex
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from uuid import uuid4
+from configs.config import settings
+from db.database import SessionLocal
+from db.crud.analyzers_crud import AnalyzerRepository
+from db.crud.batch_stats_crud import BatchStatsRepository
+from db.crud.batches_crud import BatchesRepository
+from db.crud.executions_crud import ExecutionsRepository
+from db.crud.projects_crud import ProjectRepository
+from db.crud.reports_crud import ReportRepository
+from schemas.reports_schema import ReportCreate
+from schemas.shared import (
+    AnalyzerProtocolEnum,
+    BatchEnum,
+    ExecutionEnum,
+    PROTOCOL_ENV_VAR,
+    PROTOCOL_ERROR_KEY,
+    PROTOCOL_ID_KEY,
+    SCRATCH_ENV_VAR,
+    TRANSIENT_EXIT_CODE,
+)
+from utils.dockerUtils import (
+    ExecOutput,
+    KILLED_EXIT_CODE,
+    get_image_inputs,
+    get_script_folder,
+    in_scratch_dir,
+    is_timeout_exit_code,
+    new_scratch_dir,
+    with_timeout,
+)
+from utils.fileUtils import hash_file
+from utils.statsUtils import build_batch_stats, split_stats_keys
+from utils.validationUtils import OutputValidator, get_output_validator
+
+
+class SpecCache:
+    """
+    Worker local cache for specs that rarely change. An entry is loaded again
+    once it is older than `ttl` seconds, or when the caller passes a different
+    version than the one it was loaded with.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[Any, float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any], version: Any = None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] == version and now - entry[1] < self.ttl:
+            return entry[2]
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, now, value)
+        return value
+
+
+spec_cache = SpecCache(ttl=settings.WORKER_CACHE_TTL)
 
 
 def fetchIOHelper(db, analyzer_id):
-    required_input_objects = AnalyzerService.get_analyzer_inputs(db, analyzer_id)
+    required_input_objects = AnalyzerRepository.get_analyzer_inputs(db, analyzer_id)
     required_inputs = {input_obj.key_name for input_obj in required_input_objects}
 
-    required_output_objects = AnalyzerService.get_analyzer_outputs(db, analyzer_id)
+    required_output_objects = AnalyzerRepository.get_analyzer_outputs(db, analyzer_id)
 
     required_outputs = {
         output_obj.key_name: {
@@ -22,22 +89,487 @@ def fetchIOHelper(db, analyzer_id):
     return required_inputs, required_outputs
 
 
+def fetchAnalyzerSpecHelper(db, analyzer):
+    """
+    Returns the required inputs, required outputs and compiled output
+    validator of an analyzer, from the worker cache while its io_version is unchanged.
+    """
+
+    def load():
+        required_inputs, required_outputs = fetchIOHelper(db, analyzer.id)
+        validator = get_output_validator(analyzer.id, required_outputs)
+        return required_inputs, required_outputs, validator
+
+    return spec_cache.get(("analyzer", analyzer.id), load, version=analyzer.io_version)
+
+
 def fetchProjectsAndMetadataHelper(db, project_ids, required_inputs, assignment_id):
-    assignment_metadatas = AssignmentService.get_assignment_metadata(db, assignment_id)
-    keys = {am.id: am.key_name for am in assignment_metadatas}
+    """
+    Loads the required metadata of all projects with one query, streaming the
+    rows in chunks for large batches.
+    """
+    projects_with_metadata = {id: {} for id in project_ids}
+    if not project_ids or not required_inputs:
+        return projects_with_metadata
+
+    for project_id, key_name, value in ProjectRepository.get_metadata_for_projects(
+        db,
+        project_ids,
+        assignment_id,
+        required_inputs,
+        chunk_size=settings.METADATA_CHUNK_SIZE,
+    ):
+        projects_with_metadata[project_id][key_name.upper()] = value
+
+    return projects_with_metadata
+
+
+def computeBatchStatsHelper(db, batch, store=False):
+    """
+    Computes the stats of a batch from its reports. With `store` they are saved
+    in batch_stats and served from there until the reports of the batch change.
+    """
+    analyzer_outputs = AnalyzerRepository.get_analyzer_outputs(db, batch.analyzer_id)
+    output_types = {output.key_name: output.value_type for output in analyzer_outputs}
+
+    # aggregated by the database, only one row per output comes back
+    rows = ReportRepository.aggregate_batch_reports(
+        db, batch.id, *split_stats_keys(output_types)
+    )
+    stats = build_batch_stats(output_types, rows)
+
+    if store:
+        BatchStatsRepository.save_batch_stats(db, batch.id, stats)
+    return stats
+
+
+def computeCacheKeysHelper(
+    analyzer_id, required_outputs, projects_with_metadata, file_delivery_path=None
+):
+    """
+    Computes the result cache key of every project. A key covers the analyzer
+    script, its requirements and outputs, the project metadata and the content
+    of the delivered zip file, so a report can only be reused while none of
+    them changed. Projects whose zip file is missing get no key.
+    """
+    analyzer_hasher = hashlib.sha256(str(analyzer_id).encode("utf-8"))
+    for path in get_image_inputs(analyzer_id) + [
+        get_script_folder(analyzer_id) / settings.DEFAULT_SCRIPT_NAME
+    ]:
+        analyzer_hasher.update(path.read_bytes())
+        analyzer_hasher.update(b"\0")
+    analyzer_hasher.update(
+        json.dumps(required_outputs, sort_keys=True, default=str).encode("utf-8")
+    )
+
+    cache_keys = {}
+    for project_id, metadata in projects_with_metadata.items():
+        hasher = analyzer_hasher.copy()
+        hasher.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+
+        if file_delivery_path and metadata.get("ZIP_FILE_PATH"):
+            zip_path = Path(file_delivery_path) / metadata["ZIP_FILE_PATH"]
+            if not zip_path.is_file():
+                continue
+            hasher.update(hash_file(zip_path).encode("utf-8"))
+
+        cache_keys[project_id] = hasher.hexdigest()
+
+    return cache_keys
+
+
+# The execution steps below are shared by the threads engine (tasks.py) and
+# the asyncio engine (async_engine.py), which only differ in how they wait.
+
+
+def project_exec(
+    script_command: str, metadata: Dict, timeout: int
+) -> Tuple[List[str], Dict]:
+    """
+    Returns the command and environment running the analyzer script for one
+    project, with its inputs passed as environment variables and a private
+    scratch directory.
+    """
+    scratch_dir = new_scratch_dir()
+    command = [
+        "sh",
+        "-c",
+        in_scratch_dir(with_timeout(script_command, timeout), scratch_dir),
+    ]
+    environment = {**metadata, SCRATCH_ENV_VAR: scratch_dir, "TMPDIR": scratch_dir}
+    return command, environment
+
+
+def jsonl_exec(
+    script_command: str, project_count: int, timeout: int
+) -> Tuple[str, List[str], Dict]:
+    """
+    Returns the name of the inputs file to put in /tmp, and the command and
+    environment running the analyzer script once for several projects with
+    that file on stdin.
+    """
+    inputs_name = f"flexilyzer-{uuid4().hex}.jsonl"
+    inputs_path = f"/tmp/{inputs_name}"
+    scratch_dir = new_scratch_dir()
+    command = [
+        "sh",
+        "-c",
+        in_scratch_dir(
+            f"{with_timeout(script_command, timeout * project_count)}"
+            f" < {shlex.quote(inputs_path)}",
+            scratch_dir,
+            cleanup=(inputs_path,),
+        ),
+    ]
+    environment = {
+        PROTOCOL_ENV_VAR: AnalyzerProtocolEnum.jsonl.value,
+        SCRATCH_ENV_VAR: scratch_dir,
+        "TMPDIR": scratch_dir,
+    }
+    return inputs_name, command, environment
+
+
+def is_transient(result: Optional[ExecOutput], error: Optional[str]) -> bool:
+    """
+    Whether an exec failed in a way worth retrying: the docker API call
+    failed, or the script exited with TRANSIENT_EXIT_CODE.
+    """
+    return error is not None or result.exit_code == TRANSIENT_EXIT_CODE
+
+
+def retry_backoff(attempt: int) -> float:
+    return settings.ANALYZER_RETRY_BACKOFF * 2 ** (attempt - 1)
+
+
+def process_outcome(
+    project_id: int,
+    result: Optional[ExecOutput],
+    error: Optional[str],
+    batch_id: int,
+    validator: OutputValidator,
+    timeout: int,
+    cache_keys: Dict[int, str],
+    cancelled: threading.Event,
+) -> Optional[Tuple[Optional[ReportCreate], Optional[str]]]:
+    """
+    Parses and validates the outcome of an exec.
+    Returns the report to store, or the error of the execution, or None if
+    the exec was killed by a cancellation and is already marked as cancelled.
+    """
+    if cancelled.is_set() and (error or result.exit_code != 0):
+        return None
+
+    if error:
+        print(error)
+        return None, error
+
+    parsed_result, error = parse_result(result, project_id, validator, timeout)
+    if error:
+        return None, error
+
+    report = ReportCreate(
+        report=parsed_result,
+        project_id=project_id,
+        batch_id=batch_id,
+        cache_key=cache_keys.get(project_id),
+    )
+    return report, None
+
+
+def unanswered_error(run, timeout) -> Optional[str]:
+    """
+    Error of the projects a jsonl run ended without answering for, or None if
+    the run timed out, which parse_result reports for each of them.
+    """
+    if is_timeout_exit_code(run.exit_code, run.duration, timeout):
+        return None
+    if run.exit_code == KILLED_EXIT_CODE:
+        return "Killed (possibly out of memory) before producing a result"
+    return f"Script exited with code {run.exit_code} before producing a result"
+
+
+class JsonlResults:
+    """
+    Matches the output lines of a jsonl run to its projects. Every input line
+    carries the project id under PROTOCOL_ID_KEY and the script echoes it in
+    the result, so lines printed by anything else can not shift the results
+    onto other projects. Such lines are logged and otherwise ignored.
+    """
+
+    def __init__(self, projects: Dict[int, Dict]):
+        self.projects = projects
+        # in input order, which is the order the script works through them
+        self.pending = list(projects)
+        self.outcomes = []
+        self.started_at = datetime.now()
 
-    projects_with_metadata = {}
-    for id in project_ids:
-        project_metadata_objects = ProjectsService.get_project_metadata(
-            db, project_id=id
+    def input(self) -> bytes:
+        return "".join(
+            json.dumps({**self.projects[id], PROTOCOL_ID_KEY: id}) + "\n"
+            for id in self.pending
+        ).encode("utf-8")
+
+    def add_line(self, line: bytes) -> Optional[int]:
+        """
+        Records the result in an output line.
+        Returns the project the script works on next, if the line answered one.
+        """
+        try:
+            result = json.loads(line)
+        except json.JSONDecodeError:
+            result = None
+        project_id = None
+        if isinstance(result, dict):
+            project_id = result.pop(PROTOCOL_ID_KEY, None)
+
+        if project_id not in self.pending:
+            print(f"Ignoring jsonl output line of no pending project: {line[:200]!r}")
+            return None
+
+        self.pending.remove(project_id)
+        self.outcomes.append(
+            (
+                project_id,
+                self.started_at,
+                ExecOutput(0, json.dumps(result).encode("utf-8")),
+                None,
+            )
         )
+        self.started_at = datetime.now()
+        return self.pending[0] if self.pending else None
 
-        filtered_metadata = {
-            keys[meta.assignment_metadata_id].upper(): meta.value
-            for meta in project_metadata_objects
-            if keys[meta.assignment_metadata_id] in required_inputs
-        }
+    def finish(self, run: ExecOutput, error: Optional[str], timeout) -> List:
+        """
+        Adds an outcome for each project the run ended without answering for,
+        with the exit code and stderr of the run.
+        Returns one (project_id, started_at, result, error) outcome per project.
+        """
+        if error is None:
+            error = unanswered_error(run, timeout)
+        for project_id in self.pending:
+            self.outcomes.append(
+                (
+                    project_id,
+                    self.started_at,
+                    ExecOutput(
+                        run.exit_code, b"", stderr=run.stderr, duration=run.duration
+                    ),
+                    error,
+                )
+            )
+        self.pending = []
+        return self.outcomes
 
-        projects_with_metadata[id] = filtered_metadata
 
-    return projects_with_metadata
+def parse_result(
+    result, project_id, validator: OutputValidator, timeout
+) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Parses and validates the output of one exec.
+    Returns the parsed report, or an error message if the exec failed or
+    produced an invalid report.
+    """
+    if is_timeout_exit_code(result.exit_code, result.duration, timeout):
+        print(f"Execution of project {project_id} timed out after {timeout} seconds")
+        return None, f"Timed out after {timeout} seconds"
+
+    if result.exit_code == KILLED_EXIT_CODE:
+        print(f"Execution of project {project_id} was killed")
+        return None, "Killed (possibly out of memory)"
+
+    if result.exit_code != 0:
+        print(
+            f"Something wrong happend when executing the script in the container: project {project_id}, exit code {result.exit_code}"
+        )
+        return None, f"Script exited with code {result.exit_code}"
+
+    # the result is either the whole output or its final line, so scripts
+    # may print other things before it
+    output = result.output.decode("utf-8", errors="replace")
+    try:
+        parsed_result = json.loads(output)
+    except json.JSONDecodeError as e:
+        lines = output.strip().splitlines()
+        try:
+            parsed_result = json.loads(lines[-1]) if lines else None
+        except json.JSONDecodeError:
+            parsed_result = None
+        if parsed_result is None:
+            print(e)
+            return None, f"Could not parse script output: {e}"
+
+    if isinstance(parsed_result, dict) and PROTOCOL_ERROR_KEY in parsed_result:
+        return None, f"Script error: {parsed_result[PROTOCOL_ERROR_KEY]}"
+
+    if not isinstance(parsed_result, dict):
+        return None, "Script output is not a JSON object"
+
+    validation_errors = validator.validate(parsed_result)
+
+    if validation_errors:
+        print("Validation errors:", validation_errors)
+        return None, "Validation errors: " + "; ".join(validation_errors)
+
+    return parsed_result, None
+
+
+def compress_log(log: bytes) -> Optional[bytes]:
+    return zlib.compress(log) if log else None
+
+
+class ReportWriter:
+    """
+    Buffers validated reports and execution outcomes of a worker and writes
+    them with multi-row statements, once the buffer holds `max_size` entries
+    or `max_interval` seconds have passed since the last flush.
+    Use it as a context manager so everything is flushed on exit.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_size: int = settings.REPORT_FLUSH_SIZE,
+        max_interval: float = settings.REPORT_FLUSH_INTERVAL,
+    ):
+        self.db = db
+        self.max_size = max_size
+        self.max_interval = max_interval
+        self.reports = []
+        self.executions = []
+        self.last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def add_report(self, report: ReportCreate):
+        self.reports.append(report)
+        self.flush_if_due()
+
+    def add_execution(
+        self,
+        batch_id: int,
+        project_id: int,
+        started_at: datetime,
+        error: Optional[str] = None,
+        output: Optional[ExecOutput] = None,
+    ):
+        finished_at = datetime.now()
+        self.executions.append(
+            {
+                "batch_id": batch_id,
+                "project_id": project_id,
+                "status": ExecutionEnum.FAILED if error else ExecutionEnum.SUCCEEDED,
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "duration": (finished_at - started_at).total_seconds(),
+                "error": error,
+                "stdout": compress_log(output.stdout) if output else None,
+                "stderr": compress_log(output.stderr) if output else None,
+            }
+        )
+        self.flush_if_due()
+
+    def flush(self):
+        ReportRepository.create_reports(self.db, self.reports)
+        ExecutionsRepository.finish_executions(self.db, self.executions)
+
+        self.reports = []
+        self.executions = []
+        self.last_flush = time.monotonic()
+
+    def flush_if_due(self):
+        """
+        Flushes if the buffer is full or was last flushed `max_interval`
+        seconds ago. Engines also call it while waiting for slow execs, so
+        finished outcomes do not wait for the next one to be added.
+        """
+        if (
+            len(self.reports) + len(self.executions) >= self.max_size
+            or time.monotonic() - self.last_flush >= self.max_interval
+        ):
+            self.flush()
+
+
+class AsyncReportWriter:
+    """
+    ReportWriter for an async session. Every call runs the buffered writer on
+    the sync session behind it through `run_sync`, so reports and execution
+    outcomes are written with the same statements as the threads engine.
+    Use it as an async context manager so everything is flushed on exit.
+    """
+
+    def __init__(self, session, **kwargs):
+        self.session = session
+        self.writer = ReportWriter(session.sync_session, **kwargs)
+        self.max_interval = self.writer.max_interval
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.flush()
+
+    async def flush(self):
+        await self.session.run_sync(lambda _: self.writer.flush())
+
+    async def flush_if_due(self):
+        await self.session.run_sync(lambda _: self.writer.flush_if_due())
+
+    async def add_report(self, report: ReportCreate):
+        await self.session.run_sync(lambda _: self.writer.add_report(report))
+
+    async def add_execution(
+        self,
+        batch_id: int,
+        project_id: int,
+        started_at: datetime,
+        error: Optional[str] = None,
+        output: Optional[ExecOutput] = None,
+    ):
+        await self.session.run_sync(
+            lambda _: self.writer.add_execution(
+                batch_id, project_id, started_at, error=error, output=output
+            )
+        )
+
+
+class CancellationWatcher:
+    """
+    Polls the status of a batch in a background thread while a worker runs it,
+    and calls `on_cancel` once if the batch gets cancelled.
+    Use it as a context manager around the work that should be stopped.
+    """
+
+    def __init__(
+        self,
+        batch_id: int,
+        on_cancel: Callable[[], None],
+        interval: float = settings.CANCEL_POLL_INTERVAL,
+    ):
+        self.batch_id = batch_id
+        self.on_cancel = on_cancel
+        self.interval = interval
+        self.cancelled = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self._thread.join()
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            with SessionLocal() as session:
+                status = BatchesRepository.get_batch_status(session, self.batch_id)
+
+            if status == BatchEnum.CANCELLED:
+                self.cancelled.set()
+                self.on_cancel()
+                return
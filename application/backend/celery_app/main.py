@@ -1,5 +1,17 @@
 from celery import Celery
+from kombu import Queue
 from configs.config import settings
+from schemas.shared import QueueEnum
 
-app = Celery("tasks", broker=settings.CELERY_BROKER_URL)
+app = Celery(
+    "tasks",
+    broker=settings.CELERY_BROKER_URL,
+    # chords need a result backend to collect the chunk results
+    backend=settings.CELERY_RESULT_BACKEND or f"db+{settings.DATABASE_URL}",
+)
+app.conf.task_queues = [Queue(queue.value) for queue in QueueEnum]
+app.conf.task_default_queue = QueueEnum.bulk.value
+# a worker only reserves the task it is about to run, so queued work is not
+# held back by a busy worker
+app.conf.worker_prefetch_multiplier = 1
 app.autodiscover_tasks(["celery_app.tasks"])
@@ -1,137 +1,450 @@
 from celery_app.main import app
-from celery_app.helpers import fetchProjectsAndMetadataHelper, fetchIOHelper
+from celery_app.helpers import (
+    CancellationWatcher,
+    JsonlResults,
+    ReportWriter,
+    computeBatchStatsHelper,
+    computeCacheKeysHelper,
+    fetchAnalyzerSpecHelper,
+    fetchProjectsAndMetadataHelper,
+    is_transient,
+    jsonl_exec,
+    process_outcome,
+    project_exec,
+    retry_backoff,
+)
 
 
 from pathlib import Path
-import json
-import docker
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import asyncio
+import threading
+import zipfile
+from celery.signals import worker_process_shutdown
 from docker.models.containers import Container
 from docker.errors import APIError
-from db.database import get_db
+from db.database import SessionLocal, get_db
 
-from utils.validationUtils import validate_report
-from schemas.shared import BatchEnum
+from schemas.shared import (
+    AnalyzerProtocolEnum,
+    BatchEnum,
+    DELIVERY_DIR_INPUT,
+)
 from schemas.reports_schema import ReportCreate
 from db.crud.batches_crud import BatchesRepository
+from db.crud.executions_crud import ExecutionsRepository
 from db.crud.reports_crud import ReportRepository
-from configs.config import settings
-from typing import Dict
-from configs.config import settings
+from configs.config import Engines, settings
+from utils.fileUtils import (
+    DeliveryTooLargeError,
+    create_if_not_exists,
+    extract_delivery,
+)
+from utils.validationUtils import OutputValidator
+from typing import Dict, Optional
+from utils.dockerUtils import (
+    ExecOutput,
+    capture_exec,
+    container_pool,
+    get_analyzer_image,
+    get_docker_client,
+    get_exec_timeout,
+    get_script_folder,
+    kill_container,
+    put_file,
+)
+
+
+@worker_process_shutdown.connect
+def drain_container_pool(**kwargs):
+    container_pool.drain()
+
+
+def mark_running(batch_id: int, project_id: int, started_at: datetime):
+    with SessionLocal() as session:
+        ExecutionsRepository.mark_running(session, batch_id, project_id, started_at)
+
+
+def execute_project(
+    container: Container,
+    script_command: str,
+    metadata: Dict,
+    batch_id: int,
+    project_id: int,
+    timeout: int,
+    cancelled: threading.Event,
+):
+    """
+    Runs the analyzer script for one project inside the container, with its
+    inputs passed as environment variables and a private scratch directory.
+    Transient failures, a docker API error or the script exiting with
+    TRANSIENT_EXIT_CODE, are retried with exponential backoff.
+    Returns a list with one (project_id, started_at, result, error) outcome,
+    where error is set if the exec itself could not be run, or an empty list
+    if the batch was cancelled before the project started.
+    """
+    if cancelled.is_set():
+        return []
+
+    started_at = datetime.now()
+    mark_running(batch_id, project_id, started_at)
+
+    command, environment = project_exec(script_command, metadata, timeout)
+
+    for attempt in range(settings.ANALYZER_TRANSIENT_RETRIES + 1):
+        # wakes up early if the batch gets cancelled meanwhile
+        if attempt and cancelled.wait(retry_backoff(attempt)):
+            return []
+
+        try:
+            result, error = capture_exec(container, command, environment), None
+        except APIError as e:
+            result, error = None, str(e)
+
+        if not is_transient(result, error):
+            break
+
+    return [(project_id, started_at, result, error)]
+
+
+def execute_projects_jsonl(
+    container: Container,
+    script_command: str,
+    projects: Dict[int, Dict],
+    batch_id: int,
+    timeout: int,
+    cancelled: threading.Event,
+):
+    """
+    Runs the analyzer script once for several projects. The inputs are
+    streamed on stdin as one JSON object per line, and the script answers
+    with one result per line on stdout, matched to the projects by their id.
+    Returns one (project_id, started_at, result, error) outcome per project
+    the script got to before the batch was cancelled.
+    """
+    if cancelled.is_set():
+        return []
+
+    results = JsonlResults(projects)
+    inputs_name, command, environment = jsonl_exec(
+        script_command, len(projects), timeout
+    )
+    put_file(container, "/tmp", inputs_name, results.input())
+
+    mark_running(batch_id, results.pending[0], results.started_at)
+
+    def on_line(line: bytes):
+        next_project_id = results.add_line(line)
+        if next_project_id is not None:
+            mark_running(batch_id, next_project_id, results.started_at)
+
+    error = None
+    try:
+        run = capture_exec(container, command, environment, on_line)
+    except APIError as e:
+        run, error = ExecOutput(None, b""), str(e)
+
+    if cancelled.is_set():
+        return results.outcomes
+
+    # projects the script never answered for, they get the stderr of the run
+    return results.finish(run, error, timeout * len(projects))
+
+
+def run_projects(
+    db,
+    container: Container,
+    script_command: str,
+    projects_with_metadata: Dict[int, Dict],
+    batch_id: int,
+    protocol: Optional[AnalyzerProtocolEnum],
+    concurrency: int,
+    timeout: int,
+    validator: OutputValidator,
+    cache_keys: Dict[int, str],
+    cancelled: threading.Event,
+) -> bool:
+    """
+    Threads engine: runs the projects of a chunk in the container and stores
+    their reports and execution outcomes.
+    Returns True if any project failed.
+    """
+    errors = False
+
+    # Execs only wait on the container, so they run in a thread pool while
+    # validation and report writes stay on this thread and its db session
+    with ReportWriter(db) as writer, ThreadPoolExecutor(
+        max_workers=concurrency
+    ) as executor:
+        if protocol == AnalyzerProtocolEnum.jsonl:
+            # one long running script per worker thread instead of one per project
+            project_items = list(projects_with_metadata.items())
+            futures = [
+                executor.submit(
+                    execute_projects_jsonl,
+                    container,
+                    script_command,
+                    dict(project_items[i::concurrency]),
+                    batch_id,
+                    timeout,
+                    cancelled,
+                )
+                for i in range(min(concurrency, len(project_items)))
+            ]
+        else:
+            futures = [
+                executor.submit(
+                    execute_project,
+                    container,
+                    script_command,
+                    metadata,
+                    batch_id,
+                    project_id,
+                    timeout,
+                    cancelled,
+                )
+                for project_id, metadata in projects_with_metadata.items()
+            ]
+
+        pending = set(futures)
+        while pending:
+            # wakes up at least every flush interval, so outcomes of finished
+            # execs are written while slow ones are still running
+            done, pending = wait(
+                pending, timeout=writer.max_interval, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                for project_id, started_at, result, error in future.result():
+                    processed = process_outcome(
+                        project_id,
+                        result,
+                        error,
+                        batch_id,
+                        validator,
+                        timeout,
+                        cache_keys,
+                        cancelled,
+                    )
+                    if processed is None:
+                        continue
+
+                    report, error = processed
+                    if report:
+                        writer.add_report(report)
+                    writer.add_execution(
+                        batch_id, project_id, started_at, error=error, output=result
+                    )
+                    if error:
+                        errors = True
+
+            writer.flush_if_due()
+
+    return errors
 
 
 @app.task
-def run_analyzer(project_ids: list[int], batch_id: int, course_id: int):
+def run_analyzer(
+    project_ids: list[int], batch_id: int, course_id: int, use_cache: bool = True
+) -> bool:
+    """
+    Runs the analyzer of a batch on one chunk of its projects.
+    Returns True if every project in the chunk produced a valid report.
+    """
     db = next(get_db())
 
-    batch = BatchesRepository.update_batch_status(
+    batch = BatchesRepository.update_batch_status_unless_cancelled(
         db=db, batch_id=batch_id, status=BatchEnum.RUNNING
     )
+    if batch is None:
+        return False
 
     analyzer_id = batch.analyzer_id
     assignment_id = batch.assignment_id
 
     # construct paths
     container_base_path = Path("/app")
-    container_script_path = container_base_path / settings.DEFAULT_SCRIPT_NAME
-    dockerfile_path = Path(settings.BASE_DIR)
+    container_script_folder = container_base_path / "script"
+    container_script_path = container_script_folder / settings.DEFAULT_SCRIPT_NAME
+
+    container_delivery_cache = container_base_path / "deliveries"
+
+    required_inputs, required_outputs, validator = fetchAnalyzerSpecHelper(
+        db, batch.analyzer
+    )
 
-    required_inputs, required_outputs = fetchIOHelper(db, analyzer_id)
+    # the extracted delivery is found through the zip of the project
+    needs_delivery_dir = DELIVERY_DIR_INPUT in required_inputs
+    metadata_inputs = required_inputs | {"zip_file_path"} if needs_delivery_dir else required_inputs
 
     projects_with_metadata: Dict[int, Dict] = fetchProjectsAndMetadataHelper(
-        db, project_ids, required_inputs, assignment_id
+        db, project_ids, metadata_inputs, assignment_id
     )
 
     
     file_delivery_path = None
-    if "zip_file_path" in required_inputs:
+    if "zip_file_path" in metadata_inputs:
         file_delivery_path = Path(settings.BASE_DIR + settings.DELIVERIES_FOLDER) / str(course_id) / str(assignment_id) 
 
-
-    volumes = {}    
-    if file_delivery_path:
-        volumes[str(file_delivery_path.absolute())] = {'bind': f'/app/{assignment_id}', 'mode': 'rw'}
-
-    try:
-        client = docker.from_env()
-        client.images.build(
-            path=str(dockerfile_path.resolve()),
-            buildargs={"ANALYZER_ID": str(analyzer_id)},
-            tag=f"analyzer-app:{analyzer_id}",
+    cache_keys: Dict[int, str] = {}
+    if batch.analyzer.cache_results:
+        cache_keys = computeCacheKeysHelper(
+            analyzer_id, required_outputs, projects_with_metadata, file_delivery_path
         )
-        container: Container = client.containers.create(
-            f"analyzer-app:{analyzer_id}",
-            "tail -f /dev/null",
-            volumes=volumes,
-            detach=True,
+
+    if use_cache and cache_keys:
+        # copy the reports of projects whose inputs did not change since an
+        # earlier run instead of running them again
+        cached_reports = ReportRepository.get_cached_reports(
+            db, list(set(cache_keys.values()))
         )
+        reused = 0
+        with ReportWriter(db) as writer:
+            for project_id, cache_key in cache_keys.items():
+                cached_report = cached_reports.get(cache_key)
+                if cached_report is None:
+                    continue
 
+                writer.add_report(
+                    ReportCreate(
+                        report=cached_report.report,
+                        project_id=project_id,
+                        batch_id=batch_id,
+                        cache_key=cache_key,
+                    )
+                )
+                writer.add_execution(batch_id, project_id, datetime.now())
+                del projects_with_metadata[project_id]
+                reused += 1
 
-        container.start()
+        if reused:
+            BatchesRepository.add_reused_results(db, batch_id, reused)
+        if not projects_with_metadata:
+            return True
 
-        errors = False
+    concurrency = max(
+        1, batch.analyzer.concurrency or settings.ANALYZER_DEFAULT_CONCURRENCY
+    )
 
-        for project_id, metadata in projects_with_metadata.items():
-            run_command = f"python {str(container_script_path)}"
+    volumes = {
+        str(get_script_folder(analyzer_id)): {
+            "bind": str(container_script_folder),
+            "mode": "ro",
+        }
+    }
+    if file_delivery_path:
+        volumes[str(file_delivery_path.absolute())] = {'bind': f'/app/{assignment_id}', 'mode': 'ro'}
+    if needs_delivery_dir:
+        delivery_cache_path = Path(settings.BASE_DIR + settings.DELIVERY_CACHE_FOLDER)
+        create_if_not_exists(delivery_cache_path)
+        volumes[str(delivery_cache_path.resolve())] = {
+            "bind": str(container_delivery_cache),
+            "mode": "ro",
+        }
 
-            if file_delivery_path:
-                metadata["ZIP_FILE_PATH"] = str(container_base_path / str(assignment_id) / metadata["ZIP_FILE_PATH"])
+    container = None
+    healthy = True
+    try:
+        client = get_docker_client()
+        image_tag = get_analyzer_image(client, analyzer_id)
+        container: Container = container_pool.acquire(
+            client, image_tag, volumes, concurrency
+        )
 
-            try:
-                result = container.exec_run(run_command, environment=metadata)
-            except APIError as e:
-                print(e)
+        timeout = get_exec_timeout(
+            batch.analyzer.timeout or settings.ANALYZER_DEFAULT_TIMEOUT, concurrency
+        )
+        script_command = f"python {str(container_script_path)}"
 
-            else:
-                # Return the output (or error message)
-                if result.exit_code == 0:
-                    try:
-                        parsed_result = json.loads(result.output.decode("utf-8"))
-                    except json.JSONDecodeError as e:
-                        print(result.output)
-                        print(e)
-                        errors = True
-                    else:
-                        validation_errors = validate_report(
-                            parsed_result, required_outputs
-                        )
-
-                        if validation_errors:
-                            print("Validation errors:", validation_errors)
-                            errors = True
-                        else:
-                            ReportRepository.create_report(
-                                db,
-                                report=ReportCreate(
-                                    report=json.dumps(parsed_result),
-                                    project_id=project_id,
-                                    batch_id=batch_id,
-                                ),
-                            )
-
-                else:
-                    print(
-                        "Something wrong happend when executing the script in the container: ",
-                        result,
+        for metadata in projects_with_metadata.values():
+            if needs_delivery_dir and metadata.get("ZIP_FILE_PATH"):
+                try:
+                    content_hash = extract_delivery(
+                        file_delivery_path / metadata["ZIP_FILE_PATH"]
                     )
-                    errors = True
+                    metadata[DELIVERY_DIR_INPUT.upper()] = str(
+                        container_delivery_cache / content_hash
+                    )
+                except (OSError, zipfile.BadZipFile, DeliveryTooLargeError) as e:
+                    print(e)
+            if "zip_file_path" not in required_inputs:
+                metadata.pop("ZIP_FILE_PATH", None)
+            elif file_delivery_path:
+                metadata["ZIP_FILE_PATH"] = str(container_base_path / str(assignment_id) / metadata["ZIP_FILE_PATH"])
 
-        if not errors:
-            BatchesRepository.update_batch_status(
-                db=db, batch_id=batch_id, status=BatchEnum.FINISHED
-            )
-        else:
-            BatchesRepository.update_batch_status(
-                db=db, batch_id=batch_id, status=BatchEnum.FAILED
+        # Cancelling the batch kills the container, which ends every exec in it
+        with CancellationWatcher(
+            batch_id, on_cancel=lambda: kill_container(container)
+        ) as watcher:
+            run_args = (
+                script_command,
+                projects_with_metadata,
+                batch_id,
+                batch.analyzer.protocol,
+                concurrency,
+                timeout,
+                validator,
+                cache_keys,
+                watcher.cancelled,
             )
+            if settings.ANALYZER_ENGINE == Engines.ASYNCIO:
+                # imported here, so the threads engine does not need aiodocker
+                from celery_app.async_engine import run_projects_async
+
+                errors = asyncio.run(run_projects_async(container.id, *run_args))
+            else:
+                errors = run_projects(db, container, *run_args)
+
+        if watcher.cancelled.is_set():
+            healthy = False
+            return False
+
+        return not errors
 
     except Exception as e:
         print("Catch")
         print(e)
-        BatchesRepository.update_batch_status(
-            db=db, batch_id=batch_id, status=BatchEnum.FAILED
+        healthy = False
+        # projects of the chunk that never got an outcome can be retried
+        db.rollback()
+        ExecutionsRepository.fail_executions(
+            db, batch_id, list(projects_with_metadata), error=str(e) or repr(e)
         )
+        return False
 
     finally:
-        # pass
-        container.stop()
-        container.remove()
+        if container:
+            container_pool.release(container, healthy=healthy)
+
+
+@app.task
+def finalize_batch(chunk_results: list[bool], batch_id: int):
+    """
+    Chord callback setting the final batch status once every chunk is done.
+    """
+    db = next(get_db())
+
+    status = BatchEnum.FINISHED if all(chunk_results) else BatchEnum.FAILED
+    batch = BatchesRepository.update_batch_status_unless_cancelled(
+        db=db, batch_id=batch_id, status=status
+    )
+    if batch is None:
+        return
+
+    computeBatchStatsHelper(db, batch, store=True)
+
+
+@app.task
+def fail_batch(batch_id: int):
+    """
+    Error callback marking a batch as failed if one of its chunk tasks crashed.
+    """
+    db = next(get_db())
+
+    batch = BatchesRepository.update_batch_status_unless_cancelled(
+        db=db, batch_id=batch_id, status=BatchEnum.FAILED
+    )
+    if batch is None:
+        return
+
+    computeBatchStatsHelper(db, batch, store=True)
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from enum import Enum, auto
+from typing import Optional
 
 
 class Environments(Enum):
@@ -7,18 +8,60 @@ class Environments(Enum):
     PROD = auto()
 
 
+class Engines(Enum):
+    # one thread per concurrent exec, using the docker SDK
+    THREADS = "threads"
+    # concurrent execs in one event loop, using aiodocker and asyncpg
+    ASYNCIO = "asyncio"
+
+
 class Base(BaseSettings):
     ENVIRONMENT: Environments = Environments.DEV
 
 
 class Settings(Base):
     CELERY_BROKER_URL: str
+    CELERY_RESULT_BACKEND: Optional[str] = None
     DATABASE_URL: str
+    # defaults to DATABASE_URL with the asyncpg driver
+    ASYNC_DATABASE_URL: Optional[str] = None
     BASE_DIR: str
     SCRIPTS_FOLDER: str
     DELIVERIES_FOLDER: str
     DEFAULT_SCRIPT_NAME: str
     DEFAULT_REQUIREMENTS_NAME: str
+    DELIVERY_CACHE_FOLDER: str = "delivery_cache"
+    # limits of an extracted delivery zip
+    DELIVERY_MAX_SIZE: int = 512 * 1024 * 1024
+    DELIVERY_MAX_FILES: int = 10000
+    # seconds an extracted delivery is kept after its last use
+    DELIVERY_CACHE_MAX_AGE: int = 7 * 24 * 3600
+    DELIVERY_CACHE_EVICT_INTERVAL: int = 3600
+
+    # Analyzer execution
+    ANALYZER_ENGINE: Engines = Engines.THREADS
+    ANALYZER_DEFAULT_CONCURRENCY: int = 4
+    BATCH_CHUNK_SIZE: int = 25
+    INTERACTIVE_MAX_PROJECTS: int = 10
+    METADATA_CHUNK_SIZE: int = 1000
+    DOCKER_CLIENT_POOL_SIZE: int = 32
+    CONTAINER_POOL_MAX_SIZE: int = 4
+    CONTAINER_POOL_IDLE_TIMEOUT: int = 300
+    ANALYZER_DEFAULT_TIMEOUT: int = 300
+    # limits of each exec, a container gets them times the analyzer concurrency
+    ANALYZER_CPU_LIMIT: Optional[float] = 1.0
+    ANALYZER_MEMORY_LIMIT: Optional[str] = "1g"
+    ANALYZER_PIDS_LIMIT: Optional[int] = 256
+    ANALYZER_SCRATCH_SIZE: Optional[str] = "256m"
+    CANCEL_POLL_INTERVAL: float = 2.0
+    ANALYZER_TRANSIENT_RETRIES: int = 2
+    ANALYZER_RETRY_BACKOFF: float = 2.0
+    # bytes of stdout and of stderr kept per exec
+    ANALYZER_OUTPUT_LIMIT: int = 1024 * 1024
+    # seconds analyzer specs and assignment metadata keys stay cached in a worker
+    WORKER_CACHE_TTL: int = 300
+    REPORT_FLUSH_SIZE: int = 50
+    REPORT_FLUSH_INTERVAL: float = 5.0
 
     class Config:
         env_file = ".env" if Base().ENVIRONMENT == Environments.DEV else None
@@ -1,4 +1,5 @@
 from typing import List
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from schemas.analyzer_schema import (
     AnalyzerBase,
@@ -143,6 +144,21 @@ class AnalyzerRepository:
 
         return new_analyzer
 
+    @staticmethod
+    def bump_io_version(db: Session, analyzer_id: int):
+        """
+        Marks the inputs or outputs of an analyzer as changed, as part of the
+        caller's transaction.
+
+        Parameters:
+        - db (Session): The database session.
+        - analyzer_id (int): The ID of the analyzer.
+        """
+        db.query(Analyzer).filter(Analyzer.id == analyzer_id).update(
+            {Analyzer.io_version: func.coalesce(Analyzer.io_version, 0) + 1},
+            synchronize_session=False,
+        )
+
     @staticmethod
     def update_analyzer(db: Session, analyzer_id: int, analyzer: AnalyzerBase):
         """
@@ -184,6 +200,7 @@ class AnalyzerRepository:
                 analyzer_id=analyzer_id, **input_data.model_dump()
             )
             db.add(new_input)
+        AnalyzerRepository.bump_io_version(db, analyzer_id)
         db.commit()
         return (
             db.query(AnalyzerInput)
@@ -217,6 +234,7 @@ class AnalyzerRepository:
                 display_name=model["display_name"],
             )
             db.add(new_output)
+        AnalyzerRepository.bump_io_version(db, analyzer_id)
         db.commit()
         return (
             db.query(AnalyzerOutput)
@@ -52,7 +52,7 @@ class AssignmentRepository:
         Returns:
         A list of projects for the specified assignment.
         """
-        return db.query(Project).filter(Project == assignment_id)
+        return db.query(Project).filter(Project.assignment_id == assignment_id).all()
 
     @staticmethod
     def create_assignment(db: Session, assignment: assingment_schema.AssignmentCreate):
@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from db.models import BatchStats
+
+
+class BatchStatsRepository:
+    @staticmethod
+    def get_batch_stats(db: Session, batch_id: int):
+        """
+        Retrieves the stored stats of a batch
+
+        Parameters:
+        - db (Session)
+        - batch_id: int
+
+        Returns:
+        The stored stats if they are computed, otherwise None
+        """
+        return db.query(BatchStats).filter(BatchStats.batch_id == batch_id).first()
+
+    @staticmethod
+    def save_batch_stats(db: Session, batch_id: int, stats: Dict):
+        """
+        Stores the stats of a batch, replacing earlier stats
+
+        Parameters:
+        - db (Session)
+        - batch_id: int
+        - stats: Dict
+
+        Returns:
+        None
+        """
+        db.execute(
+            insert(BatchStats)
+            .values(batch_id=batch_id, stats=stats, computed_at=datetime.now())
+            .on_conflict_do_update(
+                index_elements=[BatchStats.batch_id],
+                set_={"stats": stats, "computed_at": datetime.now()},
+            )
+        )
+        db.commit()
+
+    @staticmethod
+    def delete_batch_stats(db: Session, batch_ids: List[int]):
+        """
+        Deletes the stored stats of the given batches, without committing
+
+        Parameters:
+        - db (Session)
+        - batch_ids: List[int]
+
+        Returns:
+        None
+        """
+        db.query(BatchStats).filter(BatchStats.batch_id.in_(batch_ids)).delete(
+            synchronize_session=False
+        )
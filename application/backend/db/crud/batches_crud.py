@@ -1,9 +1,11 @@
 from typing import List
+from datetime import datetime
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 
-from db.models import Batch
-from schemas.shared import BatchEnum
+from db.models import Batch, ProjectExecution
+from schemas.shared import BatchEnum, QueueEnum
 from schemas.batch_schema import BatchCreate
 
 
@@ -52,6 +54,161 @@ class BatchesRepository:
         db.commit()
         return db.query(Batch).filter(Batch.id == batch_id).first()
 
+    @staticmethod
+    def update_batch_status_unless_cancelled(
+        db: Session, batch_id: int, status: BatchEnum
+    ):
+        """
+        Updates batch status in one conditional update, so a cancellation
+        landing at the same time is never overwritten.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - status (BatchEnum): new status of the batch
+
+        Returns:
+        the batch with updated status, or None if the batch is cancelled.
+        """
+        updated = (
+            db.query(Batch)
+            .filter(Batch.id == batch_id, Batch.status != BatchEnum.CANCELLED)
+            .update({Batch.status: status}, synchronize_session=False)
+        )
+        db.commit()
+        if not updated:
+            return None
+        return db.query(Batch).filter(Batch.id == batch_id).first()
+
+    @staticmethod
+    def cancel_batch(db: Session, batch_id: int):
+        """
+        Cancels a batch in one conditional update, so a batch finishing at the
+        same time is never overwritten.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+
+        Returns:
+        the cancelled batch, or None if the batch was not started or running.
+        """
+        updated = (
+            db.query(Batch)
+            .filter(
+                Batch.id == batch_id,
+                Batch.status.in_([BatchEnum.STARTED, BatchEnum.RUNNING]),
+            )
+            .update({Batch.status: BatchEnum.CANCELLED}, synchronize_session=False)
+        )
+        db.commit()
+        if not updated:
+            return None
+        return db.query(Batch).filter(Batch.id == batch_id).first()
+
+    @staticmethod
+    def get_batch_status(db: Session, batch_id: int):
+        """
+        Retrieves only the status of a batch.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+
+        Returns:
+        The status of the batch, or None if it does not exist.
+        """
+        return db.query(Batch.status).filter(Batch.id == batch_id).scalar()
+
+    @staticmethod
+    def set_batch_tasks(db: Session, batch_id: int, task_ids: List[str]):
+        """
+        Stores the ids of the Celery tasks running a batch, so they can be revoked.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - task_ids (List[str]): The Celery task ids.
+        """
+        db.query(Batch).filter(Batch.id == batch_id).update({Batch.task_ids: task_ids})
+        db.commit()
+
+    @staticmethod
+    def restart_batch(db: Session, batch_id: int, queue: QueueEnum):
+        """
+        Puts a finished batch back in the started state, to run some of its projects again.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - queue (QueueEnum): The queue the projects run on.
+
+        Returns:
+        The updated batch.
+        """
+        batch = db.query(Batch).filter(Batch.id == batch_id).first()
+        batch.status = BatchEnum.STARTED
+        batch.queue = queue
+        db.commit()
+        db.refresh(batch)
+        return batch
+
+    @staticmethod
+    def add_reused_results(db: Session, batch_id: int, count: int):
+        """
+        Adds to the number of results a batch reused from earlier batches.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - count (int): The number of reused results to add.
+        """
+        db.query(Batch).filter(Batch.id == batch_id).update(
+            {Batch.reused_results: func.coalesce(Batch.reused_results, 0) + count}
+        )
+        db.commit()
+
+    @staticmethod
+    def get_queue_wait_stats(db: Session, since: datetime):
+        """
+        Retrieves how long batches wait on each queue before they start.
+
+        Parameters:
+        - db (Session): The database session.
+        - since (datetime): Only batches created after this are included in the average wait.
+
+        Returns:
+        One row per queue with the number of batches not started yet, the
+        creation time of the oldest of them and the average seconds from
+        creating a batch to its first project starting.
+        """
+        first_started = (
+            select(
+                ProjectExecution.batch_id,
+                func.min(ProjectExecution.started_at).label("started_at"),
+            )
+            .group_by(ProjectExecution.batch_id)
+            .subquery()
+        )
+        waiting = Batch.status == BatchEnum.STARTED
+
+        return (
+            db.query(
+                Batch.queue,
+                func.count(Batch.id).filter(waiting).label("waiting_batches"),
+                func.min(Batch.timestamp).filter(waiting).label("oldest_waiting"),
+                func.avg(
+                    func.extract("epoch", first_started.c.started_at - Batch.timestamp)
+                )
+                .filter(Batch.timestamp >= since)
+                .label("avg_wait"),
+            )
+            .outerjoin(first_started, first_started.c.batch_id == Batch.id)
+            .filter(Batch.queue.isnot(None))
+            .group_by(Batch.queue)
+            .all()
+        )
+
     @staticmethod
     def create_batch(db: Session, batch: BatchCreate):
         """
@@ -0,0 +1,260 @@
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm import Session
+
+from db.models import Batch, ProjectExecution
+from schemas.shared import ExecutionEnum
+
+
+class ExecutionsRepository:
+    @staticmethod
+    def create_executions(db: Session, batch_id: int, project_ids: List[int]):
+        """
+        Creates a queued execution record for every project in a batch.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - project_ids (List[int]): The IDs of the projects in the batch.
+
+        Returns:
+        None. The records are inserted in a single statement.
+        """
+        if not project_ids:
+            return
+
+        db.execute(
+            insert(ProjectExecution),
+            [
+                {
+                    "batch_id": batch_id,
+                    "project_id": project_id,
+                    "status": ExecutionEnum.QUEUED,
+                }
+                for project_id in project_ids
+            ],
+        )
+        db.commit()
+
+    @staticmethod
+    def mark_running(db: Session, batch_id: int, project_id: int, started_at: datetime):
+        """
+        Marks the execution of a project as running.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - project_id (int): The ID of the project.
+        - started_at (datetime): When the execution started.
+        """
+        db.query(ProjectExecution).filter(
+            ProjectExecution.batch_id == batch_id,
+            ProjectExecution.project_id == project_id,
+            ProjectExecution.status != ExecutionEnum.CANCELLED,
+        ).update(
+            {
+                ProjectExecution.status: ExecutionEnum.RUNNING,
+                ProjectExecution.started_at: started_at,
+            }
+        )
+        db.commit()
+
+    @staticmethod
+    def finish_executions(db: Session, executions: List[Dict]):
+        """
+        Stores the outcome of several executions in one transaction.
+        Executions cancelled in the meantime keep their CANCELLED status.
+
+        Parameters:
+        - db (Session): The database session.
+        - executions (List[Dict]): One dict per execution with the keys
+          batch_id, project_id, status, started_at, finished_at, duration, error,
+          stdout and stderr.
+        """
+        if not executions:
+            return
+
+        executions_table = ProjectExecution.__table__
+        # core statement, as the ORM would require primary keys for an executemany update
+        db.execute(
+            update(executions_table)
+            .where(
+                executions_table.c.batch_id == bindparam("b_batch_id"),
+                executions_table.c.project_id == bindparam("b_project_id"),
+                executions_table.c.status != ExecutionEnum.CANCELLED,
+            )
+            .values(
+                status=bindparam("b_status"),
+                started_at=bindparam("b_started_at"),
+                finished_at=bindparam("b_finished_at"),
+                duration=bindparam("b_duration"),
+                error=bindparam("b_error"),
+                stdout=bindparam("b_stdout"),
+                stderr=bindparam("b_stderr"),
+            ),
+            [
+                {f"b_{key}": value for key, value in execution.items()}
+                for execution in executions
+            ],
+        )
+        db.commit()
+
+    @staticmethod
+    def get_execution(db: Session, batch_id: int, project_id: int):
+        """
+        Retrieves the execution of a project in a batch.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - project_id (int): The ID of the project.
+
+        Returns:
+        The execution, or None if the project is not part of the batch.
+        """
+        return (
+            db.query(ProjectExecution)
+            .filter(
+                ProjectExecution.batch_id == batch_id,
+                ProjectExecution.project_id == project_id,
+            )
+            .first()
+        )
+
+    @staticmethod
+    def get_project_ids_by_status(db: Session, batch_id: int, status: ExecutionEnum):
+        """
+        Retrieves the projects of a batch whose execution has the given status.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - status (ExecutionEnum): The execution status.
+
+        Returns:
+        A list of project IDs.
+        """
+        return [
+            project_id
+            for project_id, in db.query(ProjectExecution.project_id)
+            .filter(
+                ProjectExecution.batch_id == batch_id,
+                ProjectExecution.status == status,
+            )
+            .order_by(ProjectExecution.project_id)
+        ]
+
+    @staticmethod
+    def requeue_executions(db: Session, batch_id: int, project_ids: List[int]):
+        """
+        Resets the executions of some projects in a batch so they can run again.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - project_ids (List[int]): The IDs of the projects to run again.
+        """
+        db.query(ProjectExecution).filter(
+            ProjectExecution.batch_id == batch_id,
+            ProjectExecution.project_id.in_(project_ids),
+        ).update(
+            {
+                ProjectExecution.status: ExecutionEnum.QUEUED,
+                ProjectExecution.started_at: None,
+                ProjectExecution.finished_at: None,
+                ProjectExecution.duration: None,
+                ProjectExecution.error: None,
+                ProjectExecution.stdout: None,
+                ProjectExecution.stderr: None,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def cancel_executions(db: Session, batch_id: int):
+        """
+        Marks every queued or running execution of a batch as cancelled.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        """
+        db.query(ProjectExecution).filter(
+            ProjectExecution.batch_id == batch_id,
+            ProjectExecution.status.in_([ExecutionEnum.QUEUED, ExecutionEnum.RUNNING]),
+        ).update(
+            {
+                ProjectExecution.status: ExecutionEnum.CANCELLED,
+                ProjectExecution.finished_at: datetime.now(),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def fail_executions(
+        db: Session, batch_id: int, project_ids: List[int], error: str
+    ):
+        """
+        Marks the queued or running executions of some projects in a batch as
+        failed, for projects whose run was aborted before storing an outcome.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+        - project_ids (List[int]): The IDs of the projects.
+        - error (str): Why the executions failed.
+        """
+        db.query(ProjectExecution).filter(
+            ProjectExecution.batch_id == batch_id,
+            ProjectExecution.project_id.in_(project_ids),
+            ProjectExecution.status.in_([ExecutionEnum.QUEUED, ExecutionEnum.RUNNING]),
+        ).update(
+            {
+                ProjectExecution.status: ExecutionEnum.FAILED,
+                ProjectExecution.finished_at: datetime.now(),
+                ProjectExecution.error: error,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def get_batch_progress(db: Session, batch_id: int):
+        """
+        Aggregates the execution records of a batch in a single query.
+
+        Parameters:
+        - db (Session): The database session.
+        - batch_id (int): The ID of the batch.
+
+        Returns:
+        A row with the batch status and execution counts per status,
+        or None if the batch does not exist.
+        """
+
+        def count(status: ExecutionEnum):
+            return func.count(ProjectExecution.id).filter(
+                ProjectExecution.status == status
+            )
+
+        return (
+            db.query(
+                Batch.id,
+                Batch.status,
+                func.count(ProjectExecution.id).label("total"),
+                count(ExecutionEnum.QUEUED).label("queued"),
+                count(ExecutionEnum.RUNNING).label("running"),
+                count(ExecutionEnum.SUCCEEDED).label("succeeded"),
+                count(ExecutionEnum.FAILED).label("failed"),
+                count(ExecutionEnum.CANCELLED).label("cancelled"),
+                func.min(ProjectExecution.started_at).label("started_at"),
+                func.max(ProjectExecution.finished_at).label("finished_at"),
+            )
+            .outerjoin(ProjectExecution, ProjectExecution.batch_id == Batch.id)
+            .filter(Batch.id == batch_id)
+            .group_by(Batch.id)
+            .first()
+        )
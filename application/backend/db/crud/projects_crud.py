@@ -1,5 +1,7 @@
+from typing import Iterable, List, Optional
+
 from sqlalchemy.orm import Session
-from db.models import Project, Report, ProjectMetadata
+from db.models import AssignmentMetadata, Project, Report, ProjectMetadata
 
 
 class ProjectRepository:
@@ -55,3 +57,44 @@ class ProjectRepository:
     @staticmethod
     def get_project_ids_by_assignment_id(db: Session, assignment_id: int):
         return db.query(Project.id).filter(Project.assignment_id == assignment_id).all()
+
+    @staticmethod
+    def get_metadata_for_projects(
+        db: Session,
+        project_ids: List[int],
+        assignment_id: int,
+        key_names: Iterable[str],
+        chunk_size: Optional[int] = None,
+    ):
+        """
+        Retrieves the metadata of several projects in one query, limited to the given keys
+
+        Parameters:
+        - db (Session)
+        - project_ids: List[int]
+        - assignment_id: int
+        - key_names: Iterable[str]
+        - chunk_size: Optional[int], fetches the rows from the server in chunks of this size
+
+        Returns:
+        An iterable of (project_id, key_name, value) rows
+        """
+        query = (
+            db.query(
+                ProjectMetadata.project_id,
+                AssignmentMetadata.key_name,
+                ProjectMetadata.value,
+            )
+            .join(
+                AssignmentMetadata,
+                AssignmentMetadata.id == ProjectMetadata.assignment_metadata_id,
+            )
+            .filter(
+                ProjectMetadata.project_id.in_(project_ids),
+                AssignmentMetadata.assignment_id == assignment_id,
+                AssignmentMetadata.key_name.in_(list(key_names)),
+            )
+        )
+        if chunk_size:
+            return query.yield_per(chunk_size)
+        return query.all()
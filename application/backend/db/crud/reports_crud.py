@@ -1,5 +1,7 @@
-import json
+from typing import List
+from sqlalchemy import insert, text
 from sqlalchemy.orm import Session
+from db.crud.batch_stats_crud import BatchStatsRepository
 from db.models import Report, Project, Batch
 from schemas.reports_schema import ReportCreate
 
@@ -74,6 +76,103 @@ class ReportRepository:
             .all()
         )
 
+    @staticmethod
+    def get_cached_reports(db: Session, cache_keys: List[str]):
+        """
+        Retrieves the latest report stored for each of the given cache keys.
+
+        Parameters:
+        - db (Session)
+        - cache_keys: List[str]
+
+        Returns:
+        A dict from cache key to the latest report with that key
+        """
+        if not cache_keys:
+            return {}
+
+        reports = (
+            db.query(Report)
+            .filter(Report.cache_key.in_(cache_keys))
+            .distinct(Report.cache_key)
+            .order_by(Report.cache_key, Report.id.desc())
+            .all()
+        )
+        return {report.cache_key: report for report in reports}
+
+    @staticmethod
+    def aggregate_batch_reports(
+        db: Session,
+        batch_id: int,
+        number_keys: List[str],
+        date_keys: List[str],
+        bool_keys: List[str],
+    ):
+        """
+        Aggregates the report values of a batch per key in the database. A value
+        in the extended form {"value", "desc"} is aggregated on its value.
+
+        Parameters:
+        - db (Session)
+        - batch_id: int
+        - number_keys: List[str], keys to average as numbers
+        - date_keys: List[str], keys to average as timestamps
+        - bool_keys: List[str], keys to count true and false values of
+
+        Returns:
+        A list of (key, avg_number, avg_epoch, true_count, false_count) rows,
+        one per key found in the reports
+        """
+        keys = number_keys + date_keys + bool_keys
+        if not keys:
+            return []
+
+        return db.execute(
+            text(
+                """
+                SELECT
+                    entry.key,
+                    avg((entry.value #>> '{}')::numeric) FILTER (
+                        WHERE entry.key = ANY(:number_keys)
+                        AND jsonb_typeof(entry.value) = 'number'
+                    ) AS avg_number,
+                    avg(extract(epoch FROM (entry.value #>> '{}')::timestamp)) FILTER (
+                        WHERE entry.key = ANY(:date_keys)
+                        AND jsonb_typeof(entry.value) = 'string'
+                    ) AS avg_epoch,
+                    count(*) FILTER (
+                        WHERE entry.key = ANY(:bool_keys)
+                        AND lower(entry.value #>> '{}') = 'true'
+                    ) AS true_count,
+                    count(*) FILTER (
+                        WHERE entry.key = ANY(:bool_keys)
+                        AND lower(entry.value #>> '{}') = 'false'
+                    ) AS false_count
+                FROM reports
+                CROSS JOIN LATERAL (
+                    SELECT
+                        raw.key,
+                        CASE WHEN jsonb_typeof(raw.value) = 'object'
+                            THEN raw.value -> 'value'
+                            ELSE raw.value
+                        END AS value
+                    FROM jsonb_each(reports.report) AS raw
+                    WHERE raw.key = ANY(:keys)
+                ) AS entry
+                WHERE reports.batch_id = :batch_id
+                AND jsonb_typeof(reports.report) = 'object'
+                GROUP BY entry.key
+                """
+            ),
+            {
+                "batch_id": batch_id,
+                "keys": keys,
+                "number_keys": number_keys,
+                "date_keys": date_keys,
+                "bool_keys": bool_keys,
+            },
+        ).all()
+
     @staticmethod
     def create_report(db: Session, report: ReportCreate):
         """
@@ -87,11 +186,45 @@ class ReportRepository:
         The created report.
         """
         db_report = Report(
-            report=json.dumps(report.report),
+            report=report.report,
             project_id=report.project_id,
             batch_id=report.batch_id,
         )
         db.add(db_report)
+        BatchStatsRepository.delete_batch_stats(db, [report.batch_id])
         db.commit()
         db.refresh(db_report)
         return db_report
+
+    @staticmethod
+    def create_reports(db: Session, reports: List[ReportCreate]):
+        """
+        Create several reports with a single multi-row insert.
+
+        Parameters:
+        - db (Session): The database session.
+        - reports (List[ReportCreate]): The report data.
+
+        Returns:
+        None. The reports are committed in one transaction.
+        """
+        if not reports:
+            return
+
+        db.execute(
+            insert(Report),
+            [
+                {
+                    "report": report.report,
+                    "project_id": report.project_id,
+                    "batch_id": report.batch_id,
+                    "cache_key": report.cache_key,
+                }
+                for report in reports
+            ],
+        )
+        # stored stats of these batches are outdated now
+        BatchStatsRepository.delete_batch_stats(
+            db, list({report.batch_id for report in reports})
+        )
+        db.commit()
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -7,6 +8,14 @@ from configs.config import settings
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL
+    or make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg")
+)
+AsyncSessionLocal = async_sessionmaker(
+    autocommit=False, autoflush=False, bind=async_engine, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -17,3 +26,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async dependency for the read endpoints. The sync repositories and services
+# run on it through `await db.run_sync(...)`, which awaits their queries on
+# asyncpg instead of blocking the event loop.
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,65 @@
+import importlib
+import pkgutil
+
+from sqlalchemy import text
+
+from db import models  # registers the tables on Base
+from db.database import Base
+from db.migrations import versions
+
+# Schema changes to existing databases are applied by numbered modules in
+# db/migrations/versions, each with an `upgrade(connection)` function. Applied
+# versions are recorded in the schema_migrations table. Tables that do not
+# exist yet are created by Base.metadata.create_all before the migrations run,
+# so a migration must also be a no-op on a database that was created with the
+# current models.
+
+
+def get_migrations():
+    """
+    Returns all migrations as (version, module) sorted by version
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        version = module_info.name.split("_", 1)[0]
+        if not version.isdigit():
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append((int(version), module))
+    return sorted(migrations, key=lambda migration: migration[0])
+
+
+def run_migrations(engine):
+    """
+    Creates missing tables, then applies every migration that has not been
+    applied yet, each in its own transaction
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version INTEGER PRIMARY KEY, "
+                "name VARCHAR NOT NULL, "
+                "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+            )
+        )
+        applied = set(
+            connection.execute(text("SELECT version FROM schema_migrations")).scalars()
+        )
+
+    for version, module in get_migrations():
+        if version in applied:
+            continue
+
+        name = module.__name__.rsplit(".", 1)[-1]
+        print(f"Applying migration {name}")
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"
+                ),
+                {"version": version, "name": name},
+            )
@@ -0,0 +1,27 @@
+from sqlalchemy import text
+
+# Reports used to be json.dumps-ed once more before being stored in a JSON
+# column, so every row holds a JSON string literal. Store them as JSONB objects.
+
+
+def upgrade(connection):
+    column_type = connection.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'reports' AND column_name = 'report'"
+        )
+    ).scalar()
+    if column_type is None:
+        return
+
+    if column_type == "json":
+        connection.execute(
+            text("ALTER TABLE reports ALTER COLUMN report TYPE JSONB USING report::jsonb")
+        )
+
+    connection.execute(
+        text(
+            "UPDATE reports SET report = (report #>> '{}')::jsonb "
+            "WHERE jsonb_typeof(report) = 'string'"
+        )
+    )
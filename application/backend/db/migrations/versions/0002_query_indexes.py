@@ -0,0 +1,61 @@
+from sqlalchemy import text
+
+# Replaces the single column indexes on primary keys, descriptions and flags,
+# which are never filtered on and only slow down inserts, with composite
+# indexes matching the queries the api and workers run.
+
+DROPPED_INDEXES = [
+    *(
+        f"ix_{table}_id"
+        for table in [
+            "courses",
+            "assignments",
+            "teams",
+            "projects",
+            "project_metadata",
+            "analyzers",
+            "analyzer_inputs",
+            "analyzer_outputs",
+            "reports",
+            "batches",
+            "project_executions",
+            "assignment_metadata",
+        ]
+    ),
+    "ix_courses_name",
+    "ix_assignments_name",
+    "ix_assignments_due_date",
+    "ix_analyzers_creator",
+    "ix_analyzers_description",
+    "ix_analyzers_has_script",
+    "ix_analyzers_has_requirements",
+    "ix_analyzer_inputs_key_name",
+    "ix_analyzer_inputs_value_type",
+    "ix_analyzer_outputs_key_name",
+    "ix_analyzer_outputs_value_type",
+    "ix_analyzer_outputs_display_name",
+    "ix_batches_status",
+]
+
+CREATED_INDEXES = {
+    "ix_reports_batch_id_project_id": "reports (batch_id, project_id)",
+    "ix_reports_project_id": "reports (project_id)",
+    "ix_batches_assignment_id_analyzer_id_timestamp": (
+        "batches (assignment_id, analyzer_id, timestamp DESC)"
+    ),
+    "ix_project_metadata_project_id_assignment_metadata_id": (
+        "project_metadata (project_id, assignment_metadata_id)"
+    ),
+    "ix_projects_assignment_id": "projects (assignment_id)",
+    "ix_assignment_metadata_assignment_id_key_name": (
+        "assignment_metadata (assignment_id, key_name)"
+    ),
+}
+
+
+def upgrade(connection):
+    for name in DROPPED_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    for name, definition in CREATED_INDEXES.items():
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}"))
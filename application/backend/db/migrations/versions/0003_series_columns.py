@@ -0,0 +1,50 @@
+from sqlalchemy import text
+
+# Columns added to existing tables since the baseline schema. New tables are
+# created by create_all before the migrations run.
+
+ENUM_TYPES = {
+    "analyzerprotocolenum": ["env", "jsonl"],
+    "queueenum": ["interactive", "bulk"],
+}
+
+ADDED_COLUMNS = {
+    "analyzers": [
+        "concurrency INTEGER",
+        "timeout INTEGER",
+        "protocol analyzerprotocolenum",
+        "cache_results BOOLEAN",
+        "io_version INTEGER NOT NULL DEFAULT 1",
+    ],
+    "batches": [
+        "task_ids JSON",
+        "reused_results INTEGER DEFAULT 0",
+        "queue queueenum",
+    ],
+    "reports": [
+        "cache_key VARCHAR",
+    ],
+}
+
+
+def upgrade(connection):
+    existing_types = set(
+        connection.execute(
+            text("SELECT typname FROM pg_type WHERE typname = ANY(:names)"),
+            {"names": list(ENUM_TYPES)},
+        ).scalars()
+    )
+    for name, values in ENUM_TYPES.items():
+        if name not in existing_types:
+            labels = ", ".join(f"'{value}'" for value in values)
+            connection.execute(text(f"CREATE TYPE {name} AS ENUM ({labels})"))
+
+    for table, columns in ADDED_COLUMNS.items():
+        for column in columns:
+            connection.execute(
+                text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column}")
+            )
+
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_reports_cache_key ON reports (cache_key)")
+    )
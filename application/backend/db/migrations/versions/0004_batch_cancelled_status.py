@@ -0,0 +1,9 @@
+from sqlalchemy import text
+
+# Adds the CANCELLED batch status to the existing batchenum type. A value added
+# by ALTER TYPE can not be used in the transaction that added it, so this is a
+# migration of its own.
+
+
+def upgrade(connection):
+    connection.execute(text("ALTER TYPE batchenum ADD VALUE IF NOT EXISTS 'CANCELLED'"))
@@ -7,12 +7,25 @@ from sqlalchemy import (
     String,
     ForeignKey,
     DateTime,
+    Float,
     JSON,
+    LargeBinary,
     Enum,
+    Index,
+    UniqueConstraint,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from db.database import Base
-from schemas.shared import BatchEnum, ValueTypesInput, ValueTypesOutput
+from schemas.shared import (
+    AnalyzerProtocolEnum,
+    BatchEnum,
+    ExecutionEnum,
+    QueueEnum,
+    ValueTypesInput,
+    ValueTypesOutput,
+)
 
 # Association table for the many-to-many relationship between Assignment and Analyzer
 assignment_analyzer_association = Table(
@@ -36,9 +49,9 @@ assignment_analyzer_association = Table(
 class Course(Base):
     __tablename__ = "courses"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     tag = Column(String, unique=True, index=True)
-    name = Column(String, index=True, nullable=True)
+    name = Column(String, nullable=True)
 
     assignments = relationship("Assignment", back_populates="course")
     teams = relationship("Team", back_populates="course")
@@ -47,9 +60,9 @@ class Course(Base):
 class Assignment(Base):
     __tablename__ = "assignments"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    name = Column(String, index=True)
-    due_date = Column(DateTime, index=True, nullable=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String)
+    due_date = Column(DateTime, nullable=True)
 
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
     course = relationship("Course", back_populates="assignments")
@@ -66,7 +79,7 @@ class Assignment(Base):
 class Team(Base):
     __tablename__ = "teams"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
 
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"))
     course = relationship("Course", back_populates="teams")
@@ -76,8 +89,9 @@ class Team(Base):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (Index("ix_projects_assignment_id", "assignment_id"),)
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
 
     assignment_id = Column(Integer, ForeignKey("assignments.id", ondelete="CASCADE"))
     assignment = relationship("Assignment", back_populates="projects")
@@ -92,8 +106,15 @@ class Project(Base):
 
 class ProjectMetadata(Base):
     __tablename__ = "project_metadata"
+    __table_args__ = (
+        Index(
+            "ix_project_metadata_project_id_assignment_metadata_id",
+            "project_id",
+            "assignment_metadata_id",
+        ),
+    )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     value = Column(JSON, nullable=True)
 
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
@@ -106,12 +127,18 @@ class ProjectMetadata(Base):
 class Analyzer(Base):
     __tablename__ = "analyzers"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True, index=True)
-    creator = Column(String, index=True, nullable=True)
-    description = Column(String, index=True, nullable=True)
-    has_script = Column(Boolean, index=True, default=False)
-    has_requirements = Column(Boolean, index=True, default=False)
+    creator = Column(String, nullable=True)
+    description = Column(String, nullable=True)
+    has_script = Column(Boolean, default=False)
+    has_requirements = Column(Boolean, default=False)
+    concurrency = Column(Integer, nullable=True)
+    timeout = Column(Integer, nullable=True)
+    protocol = Column(Enum(AnalyzerProtocolEnum), nullable=True)
+    cache_results = Column(Boolean, nullable=True)
+    # bumped whenever the inputs or outputs change, invalidating worker caches
+    io_version = Column(Integer, default=1, nullable=False)
 
     analyzer_inputs = relationship("AnalyzerInput", back_populates="analyzer")
     analyzer_outputs = relationship("AnalyzerOutput", back_populates="analyzer")
@@ -128,9 +155,9 @@ class Analyzer(Base):
 class AnalyzerInput(Base):
     __tablename__ = "analyzer_inputs"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    key_name = Column(String, index=True)
-    value_type = Column(Enum(ValueTypesInput), index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    key_name = Column(String)
+    value_type = Column(Enum(ValueTypesInput))
 
     analyzer_id = Column(Integer, ForeignKey("analyzers.id", ondelete="CASCADE"))
     analyzer = relationship("Analyzer", back_populates="analyzer_inputs")
@@ -139,10 +166,10 @@ class AnalyzerInput(Base):
 class AnalyzerOutput(Base):
     __tablename__ = "analyzer_outputs"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    key_name = Column(String, index=True)
-    value_type = Column(Enum(ValueTypesOutput), index=True)
-    display_name = Column(String, index=True, nullable=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    key_name = Column(String)
+    value_type = Column(Enum(ValueTypesOutput))
+    display_name = Column(String, nullable=True)
     extended_metadata = Column(JSON, nullable=True)
 
     analyzer_id = Column(Integer, ForeignKey("analyzers.id", ondelete="CASCADE"))
@@ -151,9 +178,14 @@ class AnalyzerOutput(Base):
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_batch_id_project_id", "batch_id", "project_id"),
+        Index("ix_reports_project_id", "project_id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    report = Column(JSON, nullable=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    report = Column(JSONB, nullable=True)
+    cache_key = Column(String, index=True, nullable=True)
 
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
     project = relationship("Project", back_populates="reports")
@@ -163,19 +195,65 @@ class Report(Base):
 
 class Batch(Base):
     __tablename__ = "batches"
+    __table_args__ = (
+        Index(
+            "ix_batches_assignment_id_analyzer_id_timestamp",
+            "assignment_id",
+            "analyzer_id",
+            text("timestamp DESC"),
+        ),
+    )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     timestamp = Column(DateTime, default=datetime.now, index=True)
     assignment_id = Column(Integer, ForeignKey("assignments.id", ondelete="CASCADE"))
-    status = Column(Enum(BatchEnum), index=True, default=BatchEnum.STARTED)
+    status = Column(Enum(BatchEnum), default=BatchEnum.STARTED)
+    task_ids = Column(JSON, nullable=True)
+    reused_results = Column(Integer, default=0)
+    queue = Column(Enum(QueueEnum), nullable=True)
     analyzer_id = Column(Integer, ForeignKey("analyzers.id", ondelete="CASCADE"))
     analyzer = relationship("Analyzer", back_populates="batches")
 
+    executions = relationship("ProjectExecution", back_populates="batch")
+
+
+class BatchStats(Base):
+    __tablename__ = "batch_stats"
+
+    batch_id = Column(
+        Integer, ForeignKey("batches.id", ondelete="CASCADE"), primary_key=True
+    )
+    stats = Column(JSONB, nullable=False)
+    computed_at = Column(DateTime, default=datetime.now)
+
+
+class ProjectExecution(Base):
+    __tablename__ = "project_executions"
+    __table_args__ = (UniqueConstraint("batch_id", "project_id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    status = Column(Enum(ExecutionEnum), default=ExecutionEnum.QUEUED)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration = Column(Float, nullable=True)
+    error = Column(String, nullable=True)
+    # zlib compressed, bounded by ANALYZER_OUTPUT_LIMIT
+    stdout = Column(LargeBinary, nullable=True)
+    stderr = Column(LargeBinary, nullable=True)
+
+    batch_id = Column(Integer, ForeignKey("batches.id", ondelete="CASCADE"))
+    batch = relationship("Batch", back_populates="executions")
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+
 
 class AssignmentMetadata(Base):
     __tablename__ = "assignment_metadata"
+    __table_args__ = (
+        Index("ix_assignment_metadata_assignment_id_key_name", "assignment_id", "key_name"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     assignment_id = Column(
         Integer, ForeignKey("assignments.id", ondelete="CASCADE"), nullable=False
     )
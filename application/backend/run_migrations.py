@@ -0,0 +1,5 @@
+from db.database import engine
+from db.migrations import run_migrations
+
+
+run_migrations(engine)
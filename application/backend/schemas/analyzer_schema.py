@@ -1,7 +1,7 @@
 from pydantic import BaseModel, validator
 from typing import List, Optional
 from pydantic import Json
-from schemas.shared import ValueTypesInput, ValueTypesOutput
+from schemas.shared import AnalyzerProtocolEnum, ValueTypesInput, ValueTypesOutput
 
 
 class AnalyzerOutputBase(BaseModel):
@@ -28,6 +28,24 @@ class AnalyzerBase(BaseModel):
     name: str
     description: str
     creator: Optional[str] = None
+    concurrency: Optional[int] = None
+    timeout: Optional[int] = None
+    protocol: Optional[AnalyzerProtocolEnum] = None
+    cache_results: Optional[bool] = None
+
+    @validator("concurrency")
+    def validate_concurrency(cls, concurrency: Optional[int]):
+        if concurrency is not None and concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+
+        return concurrency
+
+    @validator("timeout")
+    def validate_timeout(cls, timeout: Optional[int]):
+        if timeout is not None and timeout < 1:
+            raise ValueError("Timeout must be at least 1 second")
+
+        return timeout
 
 
 class AnalyzerInternalUpdate(AnalyzerBase):
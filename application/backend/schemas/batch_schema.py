@@ -1,12 +1,13 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Dict, List, Optional
-from schemas.shared import BatchEnum
+from schemas.shared import BatchEnum, ExecutionEnum, QueueEnum
 
 
 class BatchBase(BaseModel):
     assignment_id: int
     analyzer_id: int
+    queue: Optional[QueueEnum] = None
 
 
 # Create models
@@ -18,11 +19,37 @@ class BatchResponse(BatchBase):
     id: int
     status: BatchEnum
     timestamp: datetime
+    reused_results: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 
+class BatchProgressResponse(BaseModel):
+    id: int
+    status: BatchEnum
+    total: int
+    queued: int
+    running: int
+    succeeded: int
+    failed: int
+    cancelled: int
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ExecutionLogResponse(BaseModel):
+    batch_id: int
+    project_id: int
+    status: ExecutionEnum
+    error: Optional[str] = None
+    stdout: Optional[str] = None
+    stderr: Optional[str] = None
+
+
 class BatchStatsResponse(BaseModel):
     id: int
     stats: Dict[str, Dict]
@@ -3,6 +3,7 @@ from datetime import datetime
 from typing import List, Optional
 from pydantic import Json
 from sqlalchemy import true
+from schemas.shared import QueueEnum
 
 
 class JobBase(BaseModel):
@@ -15,4 +16,18 @@ class JobResponse(JobBase):
 
 
 class JobCreate(JobBase):
-    pass
+    # skip cached results and run every project
+    force: Optional[bool] = False
+    # run on the interactive queue regardless of the number of projects
+    interactive: Optional[bool] = False
+
+
+class QueueStatsResponse(BaseModel):
+    queue: QueueEnum
+    # messages waiting in the broker, None if the broker is unreachable
+    depth: Optional[int] = None
+    waiting_batches: int
+    # seconds the oldest batch that has not started yet has been waiting
+    oldest_wait: Optional[float] = None
+    # average seconds from creating a batch to its first project starting
+    avg_wait: Optional[float] = None
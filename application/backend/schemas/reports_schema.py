@@ -1,17 +1,16 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional
-from pydantic import Json
+from typing import Any, Dict, List, Optional
 
 
 class ReportBase(BaseModel):
-    report: Json
+    report: Dict[str, Any]
     project_id: int
     batch_id: int
 
 
 class ReportCreate(ReportBase):
-    pass
+    cache_key: Optional[str] = None
 
 
 class ReportResponse(ReportBase):
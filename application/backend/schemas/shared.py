@@ -10,6 +10,46 @@ class BatchEnum(enum.Enum):
     RUNNING = "RUNNING"
     FAILED = "FAILED"
     FINISHED = "FINISHED"
+    CANCELLED = "CANCELLED"
+
+
+class ExecutionEnum(enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class QueueEnum(enum.Enum):
+    # small reruns, served by reserved workers
+    interactive = "interactive"
+    # large batches
+    bulk = "bulk"
+
+
+class AnalyzerProtocolEnum(enum.Enum):
+    # one script run per project, inputs passed as environment variables
+    env = "env"
+    # one script run per group of projects, one JSON object of inputs per
+    # line on stdin and one result per line on stdout, both carrying the
+    # project id under PROTOCOL_ID_KEY
+    jsonl = "jsonl"
+
+
+PROTOCOL_ENV_VAR = "FLEXILYZER_PROTOCOL"
+PROTOCOL_ERROR_KEY = "__error__"
+PROTOCOL_ID_KEY = "__id__"
+
+# exit code (EX_TEMPFAIL) an analyzer uses for transient failures, such as
+# being rate limited by an API, to have the project retried
+TRANSIENT_EXIT_CODE = 75
+
+# private scratch directory of an exec, wiped once the project is done
+SCRATCH_ENV_VAR = "SCRATCH_DIR"
+
+# analyzer input that receives the extracted delivery zip of a project
+DELIVERY_DIR_INPUT = "delivery_dir"
 
 
 class ValueTypesInput(enum.Enum):
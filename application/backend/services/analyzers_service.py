@@ -63,7 +63,14 @@ class AnalyzerService:
                 detail=f"Analyzer with name '{analyzer.name}' already exists",
             )
 
-        base_analyzer = {"name": analyzer.name, "description": analyzer.description}
+        base_analyzer = {
+            "name": analyzer.name,
+            "description": analyzer.description,
+            "concurrency": analyzer.concurrency,
+            "timeout": analyzer.timeout,
+            "protocol": analyzer.protocol,
+            "cache_results": analyzer.cache_results,
+        }
 
         base_analyzer_casted: AnalyzerBase = AnalyzerBase(**base_analyzer)
 
@@ -100,6 +107,10 @@ class AnalyzerService:
             id=created_analyzer.id,
             name=created_analyzer.name,
             description=created_analyzer.description,
+            concurrency=created_analyzer.concurrency,
+            timeout=created_analyzer.timeout,
+            protocol=created_analyzer.protocol,
+            cache_results=created_analyzer.cache_results,
             inputs=casted_resp_inputs,
             outputs=casted_resp_outputs,
         )
@@ -1,14 +1,19 @@
-import json
+import zlib
 from fastapi import HTTPException
-from schemas.shared import BatchEnum, ValueTypesOutput
+from schemas.shared import BatchEnum, ExecutionEnum
 from db.crud.reports_crud import ReportRepository
 from services.reports_service import ReportService
 from services.analyzers_service import AnalyzerService
 from services.assignments_service import AssignmentService
 from services.teams_service import TeamService
+from services.jobs_service import JobsService
+from celery_app.main import app as celery_app
+from celery_app.helpers import computeBatchStatsHelper
+from schemas.batch_schema import ExecutionLogResponse
+from db.crud.batch_stats_crud import BatchStatsRepository
 from db.crud.batches_crud import BatchesRepository
+from db.crud.executions_crud import ExecutionsRepository
 from db.crud.assignments_crud import AssignmentRepository
-from datetime import datetime, timedelta
 
 
 class BatchService:
@@ -25,6 +30,95 @@ class BatchService:
             )
         return batch
 
+    @staticmethod
+    def cancel_batch(db, batch_id: int):
+        # workers poll the batch status and stop once they see it cancelled
+        batch = BatchesRepository.cancel_batch(db=db, batch_id=batch_id)
+        if batch is None:
+            batch = BatchService.get_batch(db=db, batch_id=batch_id)
+            raise HTTPException(
+                status_code=409,
+                detail=f"Batch with id {batch_id} can not be cancelled. Batch status: {BatchEnum(batch.status).value}",
+            )
+        ExecutionsRepository.cancel_executions(db=db, batch_id=batch_id)
+
+        if batch.task_ids:
+            celery_app.control.revoke(batch.task_ids)
+
+        return batch
+
+    @staticmethod
+    def retry_failed(db, batch_id: int):
+        batch = BatchService.get_batch(db=db, batch_id=batch_id)
+
+        if batch.status in [BatchEnum.STARTED, BatchEnum.RUNNING]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Batch with id {batch_id} is still running. Batch status: {BatchEnum(batch.status).value}",
+            )
+
+        # its cancelled projects never ran, finishing it would hide that
+        if batch.status == BatchEnum.CANCELLED:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Batch with id {batch_id} is cancelled and can not be retried",
+            )
+
+        project_ids = ExecutionsRepository.get_project_ids_by_status(
+            db=db, batch_id=batch_id, status=ExecutionEnum.FAILED
+        )
+        if not project_ids:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch with id {batch_id} has no failed projects",
+            )
+
+        # the results are merged into the same batch, failed projects have no report in it
+        queue = JobsService.select_queue(len(project_ids))
+        ExecutionsRepository.requeue_executions(
+            db=db, batch_id=batch_id, project_ids=project_ids
+        )
+        batch = BatchesRepository.restart_batch(db=db, batch_id=batch_id, queue=queue)
+
+        assignment = AssignmentService.get_assignment(
+            db=db, assignment_id=batch.assignment_id
+        )
+        JobsService.dispatch_batch(db, batch, project_ids, assignment.course_id, queue)
+
+        return batch
+
+    @staticmethod
+    def get_execution_logs(db, batch_id: int, project_id: int):
+        execution = ExecutionsRepository.get_execution(
+            db=db, batch_id=batch_id, project_id=project_id
+        )
+        if not execution:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Project with id {project_id} not found in batch with id {batch_id}",
+            )
+
+        def decompress(log):
+            return zlib.decompress(log).decode("utf-8", errors="replace") if log else None
+
+        return ExecutionLogResponse(
+            batch_id=batch_id,
+            project_id=project_id,
+            status=execution.status,
+            error=execution.error,
+            stdout=decompress(execution.stdout),
+            stderr=decompress(execution.stderr),
+        )
+
+    @staticmethod
+    def get_batch_progress(db, batch_id: int):
+        progress = ExecutionsRepository.get_batch_progress(db=db, batch_id=batch_id)
+        if not progress:
+            raise HTTPException(
+                status_code=404, detail=f"Batch with id {batch_id} not found"
+            )
+        return progress
+
     @staticmethod
     def get_assignment_analyzers_batches(db, analyzer_id, assignment_id):
         AnalyzerService.get_analyzer(db=db, analyzer_id=analyzer_id)
@@ -58,111 +152,16 @@ class BatchService:
 
     @staticmethod
     def get_batch_stats(db, batch_id):
-
         batch = BatchService.get_batch(db=db, batch_id=batch_id)
 
-        analyzer_outputs = AnalyzerService.get_analyzer_outputs(
-            db=db, analyzer_id=batch.analyzer_id
-        )
-
-        stats = dict()
-
-        for output in analyzer_outputs:
-            if output.value_type == ValueTypesOutput.str:
-                continue
-            elif output.value_type == ValueTypesOutput.bool:
-                stats[output.key_name] = {"distribution": {"true": 0, "false": 0}}
-            elif output.value_type == ValueTypesOutput.int:
-                stats[output.key_name] = {"avg": None}
-            elif output.value_type == ValueTypesOutput.range:
-                stats[output.key_name] = {"avg": None}
-            elif output.value_type == ValueTypesOutput.date:
-                stats[output.key_name] = {"avg": None}
-            else:
-                continue
-
-        reports = BatchService.get_batch_reports(db=db, batch_id=batch_id)
-
-        # Assuming ValueTypesOutput is an Enum with possible value types
-        for report in reports:
-            for key, value in json.loads(report.report).items():
-                # Skip keys not in analyzer_outputs
-                if key not in stats:
-                    continue
-
-                output = next((o for o in analyzer_outputs if o.key_name == key), None)
-                if not output:
-                    continue
-
-                if type(value) == dict:
-                    value = value["value"] 
-
-                # Handle boolean values: Update distribution counts
-                if output.value_type == ValueTypesOutput.bool:
-                    bool_value = str(
-                        value
-                    ).lower()  # Convert boolean to string and lowercase
-                    if bool_value in stats[key]["distribution"]:
-                        if stats[key]["distribution"][bool_value] is None:
-                            stats[key]["distribution"][bool_value] = 1
-                        else:
-                            stats[key]["distribution"][bool_value] += 1
-                    continue
-
-                # Handle integer and range values: Calculate average
-                if output.value_type in [
-                    ValueTypesOutput.int,
-                    ValueTypesOutput.range,
-                    ValueTypesOutput.date,
-                ]:
-                    if "values" not in stats[key]:
-                        stats[key]["values"] = []
-                    stats[key]["values"].append(value)
-
-        # Finalize stats by calculating averages
-        for key, value in stats.items():
-            output = next((o for o in analyzer_outputs if o.key_name == key), None)
-            if not output:
-                continue
-
-            if output.value_type in [ValueTypesOutput.int, ValueTypesOutput.range]:
-                avg_value = (
-                    sum(value["values"]) / len(value["values"])
-                    if value["values"]
-                    else None
-                )
-                stats[key]["avg"] = stats[key].pop("values")
-                stats[key]["avg"] = avg_value
-
-            elif output.value_type == ValueTypesOutput.date:
-                if value["values"]:
-                    datetime_objects = [
-                        datetime.strptime(date_string, "%Y-%m-%dT%H:%M:%S")
-                        for date_string in value["values"]
-                    ]
-                    # Convert each datetime object to a timestamp and calculate the average
-                    avg_timestamp = sum(
-                        dt.timestamp() for dt in datetime_objects
-                    ) / len(value["values"])
-                    # Convert the average timestamp back to a datetime object
-                    avg_date = datetime.fromtimestamp(avg_timestamp)
-                    avg_value = str(avg_date)
-                else:
-                    avg_value = None
-
-                stats[key]["avg"] = stats[key].pop("values")
-                stats[key]["avg"] = avg_value
-
-            elif output.value_type == ValueTypesOutput.bool:
-                true_count = stats[key]["distribution"]["true"]
-                false_count = stats[key]["distribution"]["false"]
-                stats[key]["distribution"]["true"] = (
-                    true_count / (true_count + false_count)
-                ) * 100
-                stats[key]["distribution"]["false"] = (
-                    100 - stats[key]["distribution"]["true"]
-                )
+        stored_stats = BatchStatsRepository.get_batch_stats(db=db, batch_id=batch_id)
+        if stored_stats:
+            return {"id": batch_id, "stats": stored_stats.stats}
 
+        # finished batches keep their stats until their reports change
+        stats = computeBatchStatsHelper(
+            db, batch, store=batch.status in [BatchEnum.FINISHED, BatchEnum.FAILED]
+        )
         return {"id": batch_id, "stats": stats}
 
     @staticmethod
@@ -2,22 +2,34 @@ from services.analyzers_service import AnalyzerService
 from services.assignments_service import AssignmentService
 from services.projects_service import ProjectsService
 from db.crud.batches_crud import BatchesRepository
+from db.crud.executions_crud import ExecutionsRepository
 from db.crud.projects_crud import ProjectRepository
 from schemas.batch_schema import BatchCreate
-from schemas.shared import BatchEnum
+from schemas.shared import BatchEnum, QueueEnum
+from schemas.job_schema import QueueStatsResponse
 
-from celery_app.tasks import run_analyzer
+from celery import chord
+from celery.utils import uuid
+from celery_app.main import app as celery_app
+from celery_app.tasks import run_analyzer, finalize_batch, fail_batch
+from configs.config import settings
 
+from datetime import datetime, timedelta
 from fastapi import HTTPException
 
 
 class JobsService:
     @staticmethod
-    def run_job(db, analyzer_id, assignment_id, project_ids):
+    def run_job(
+        db, analyzer_id, assignment_id, project_ids, force=False, interactive=False
+    ):
         analyzer = AnalyzerService.get_analyzer(db, analyzer_id=analyzer_id)
         assignment = AssignmentService.get_assignment(db, assignment_id=assignment_id)
 
         if project_ids:
+            # a project can only have one execution per batch
+            project_ids = list(dict.fromkeys(project_ids))
+
             errors = []
             for project_id in project_ids:
                 try:
@@ -38,22 +50,114 @@ class JobsService:
             )
 
         if project_ids is None:
-            project_ids = ProjectRepository.get_project_ids_by_assignment_id(
-                db=db, assignment_id=assignment_id
-            )
+            project_ids = [
+                id
+                for id, in ProjectRepository.get_project_ids_by_assignment_id(
+                    db=db, assignment_id=assignment_id
+                )
+            ]
             if not project_ids:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Assignment with id {assignment_id} dont have any projects related to itself",
                 )
 
-        project_ids = [id for id, in project_ids]
+        queue = JobsService.select_queue(len(project_ids), interactive=interactive)
 
         batch = BatchesRepository.create_batch(
             db=db,
-            batch=BatchCreate(assignment_id=assignment_id, analyzer_id=analyzer_id),
+            batch=BatchCreate(
+                assignment_id=assignment_id, analyzer_id=analyzer_id, queue=queue
+            ),
         )
 
-        run_analyzer.delay(project_ids, batch.id, assignment.course_id)
+        ExecutionsRepository.create_executions(
+            db=db, batch_id=batch.id, project_ids=project_ids
+        )
+
+        JobsService.dispatch_batch(
+            db, batch, project_ids, assignment.course_id, queue, use_cache=not force
+        )
 
         return batch
+
+    @staticmethod
+    def select_queue(project_count, interactive=False):
+        # small reruns go to reserved workers instead of waiting behind bulk batches
+        if interactive or project_count <= settings.INTERACTIVE_MAX_PROJECTS:
+            return QueueEnum.interactive
+        return QueueEnum.bulk
+
+    @staticmethod
+    def dispatch_batch(db, batch, project_ids, course_id, queue, use_cache=True):
+        """
+        Queues the chunk tasks of a batch, and the callback setting its final status.
+        """
+        chunk_size = settings.BATCH_CHUNK_SIZE
+        chunks = [
+            project_ids[i : i + chunk_size]
+            for i in range(0, len(project_ids), chunk_size)
+        ]
+
+        header = [
+            run_analyzer.s(
+                chunk, batch.id, course_id, use_cache=use_cache
+            ).set(task_id=uuid(), queue=queue.value)
+            for chunk in chunks
+        ]
+        callback = finalize_batch.s(batch.id).set(task_id=uuid(), queue=queue.value)
+
+        # stored up front so a cancelled batch can revoke tasks still queued
+        BatchesRepository.set_batch_tasks(
+            db=db,
+            batch_id=batch.id,
+            task_ids=[sig.id for sig in header] + [callback.id],
+        )
+
+        chord(header)(
+            callback.on_error(fail_batch.si(batch.id).set(queue=queue.value))
+        )
+
+    @staticmethod
+    def get_queue_stats(db):
+        wait_stats = {
+            row.queue: row
+            for row in BatchesRepository.get_queue_wait_stats(
+                db, since=datetime.now() - timedelta(hours=1)
+            )
+        }
+
+        depths = {}
+        try:
+            with celery_app.connection_for_write() as conn:
+                conn.ensure_connection(max_retries=1)
+                for queue in QueueEnum:
+                    # a passive declare fails for queues no worker declared yet
+                    try:
+                        with conn.channel() as channel:
+                            depths[queue] = channel.queue_declare(
+                                queue=queue.value, passive=True
+                            ).message_count
+                    except Exception as e:
+                        print(e)
+        except Exception as e:
+            print(e)
+
+        stats = []
+        for queue in QueueEnum:
+            row = wait_stats.get(queue)
+            stats.append(
+                QueueStatsResponse(
+                    queue=queue,
+                    depth=depths.get(queue),
+                    waiting_batches=row.waiting_batches if row else 0,
+                    oldest_wait=(
+                        (datetime.now() - row.oldest_waiting).total_seconds()
+                        if row and row.oldest_waiting
+                        else None
+                    ),
+                    avg_wait=row.avg_wait if row else None,
+                )
+            )
+
+        return stats
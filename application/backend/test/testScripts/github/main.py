@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 from pydantic import BaseModel
 import requests
 import re
@@ -51,6 +52,12 @@ def main(url: str) -> Return:
 
     # Make a request to the GitHub API for repository info
     repo_response = requests.get(repo_api_url)
+    if repo_response.status_code == 429 or (
+        repo_response.status_code == 403
+        and repo_response.headers.get("X-RateLimit-Remaining") == "0"
+    ):
+        # rate limited, exit with EX_TEMPFAIL so the platform retries later
+        sys.exit(75)
     if repo_response.status_code != 200:
         return {
             "Error": f"GitHub API responded with status code {repo_response.status_code} for repo info"
@@ -18,8 +18,9 @@ class Return(BaseModel):
 
 def run_lighthouse(url: str):
     """Function for running the lighthouse command in cmd line"""
-    output_file = (
-        f"{url.replace('http://', '').replace('https://', '').replace('/', '_')}.json"
+    output_file = os.path.join(
+        os.getenv("SCRATCH_DIR", "."),
+        f"{url.replace('http://', '').replace('https://', '').replace('/', '_')}.json",
     )
 
     if not url.startswith("https://"):
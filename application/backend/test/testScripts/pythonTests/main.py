@@ -26,9 +26,16 @@ def load_module_from_path(path):
 def extract_and_load_module_from_zip(zip_path: Path):
 
     group = zip_path.stem
+    tmp_dir = os.getenv("SCRATCH_DIR", "/app/tmp")
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(f"/app/tmp/{group}")  
-    return load_module_from_path(f"/app/tmp/{group}/{PYTHON_FILE_NAME}")
+        zip_ref.extractall(f"{tmp_dir}/{group}")  
+    return load_module_from_path(f"{tmp_dir}/{group}/{PYTHON_FILE_NAME}")
+
+def load_delivery_module(zip_path: Path, delivery_dir: Optional[str]):
+    # the platform provides the extracted delivery when DELIVERY_DIR is an input
+    if delivery_dir:
+        return load_module_from_path(f"{delivery_dir}/{PYTHON_FILE_NAME}")
+    return extract_and_load_module_from_zip(zip_path)
 
 
 class TestMathFunctions(unittest.TestCase):
@@ -36,7 +43,7 @@ class TestMathFunctions(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        cls.module = extract_and_load_module_from_zip(zip_file_path)
+        cls.module = load_delivery_module(zip_file_path, delivery_dir)
 
     def test_add(self):
         add = self.module.add
@@ -113,5 +120,6 @@ def main(zip_file_path: Path) -> Return:
     return test_result
 
 if __name__ == "__main__":
-    zip_file_path = Path(os.getenv('ZIP_FILE_PATH'))
+    zip_file_path = Path(os.getenv('ZIP_FILE_PATH', ''))
+    delivery_dir = os.getenv('DELIVERY_DIR')
     print(main(zip_file_path).model_dump_json())  
\ No newline at end of file
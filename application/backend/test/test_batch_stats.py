@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from db.crud.reports_crud import ReportRepository
+from db.database import SessionLocal, engine
+from db.migrations import run_migrations
+from db.models import Batch, Report
+from schemas.shared import ValueTypesOutput
+from utils.statsUtils import build_batch_stats, split_stats_keys
+
+OUTPUT_TYPES = {
+    "lines": ValueTypesOutput.int,
+    "score": ValueTypesOutput.range,
+    "deployed": ValueTypesOutput.bool,
+    "last_commit": ValueTypesOutput.date,
+    "name": ValueTypesOutput.str,
+}
+
+
+@pytest.fixture(scope="module")
+def db():
+    try:
+        run_migrations(engine)
+    except OperationalError as e:
+        pytest.skip(f"Database not reachable: {e}")
+
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_split_stats_keys():
+    assert split_stats_keys(OUTPUT_TYPES) == (
+        ["lines", "score"],
+        ["last_commit"],
+        ["deployed"],
+    )
+
+
+def test_build_batch_stats():
+    rows = [
+        ("lines", 12.5, None, 0, 0),
+        ("deployed", None, None, 3, 1),
+        ("last_commit", None, 86400.0, 0, 0),
+    ]
+
+    assert build_batch_stats(OUTPUT_TYPES, rows) == {
+        "lines": {"avg": 12.5},
+        "score": {"avg": None},
+        "deployed": {"distribution": {"true": 75.0, "false": 25.0}},
+        "last_commit": {"avg": "1970-01-02 00:00:00"},
+    }
+
+
+def test_build_batch_stats_without_values():
+    assert build_batch_stats({"deployed": ValueTypesOutput.bool}, []) == {
+        "deployed": {"distribution": {"true": None, "false": None}}
+    }
+
+
+def test_aggregate_batch_reports(db):
+    batch = Batch()
+    db.add(batch)
+    db.flush()
+    for report in [
+        {
+            "lines": 10,
+            "score": {"value": 4, "desc": "ok"},
+            "deployed": True,
+            "last_commit": "2024-01-01T00:00:00",
+            "name": "a",
+        },
+        {
+            "lines": {"value": 20, "desc": None},
+            "score": 8,
+            "deployed": {"value": False, "desc": None},
+            "last_commit": {"value": "2024-01-03T00:00:00", "desc": None},
+            "name": "b",
+        },
+        {
+            "lines": None,
+            "score": None,
+            "deployed": True,
+            "last_commit": None,
+            "name": None,
+        },
+    ]:
+        db.add(Report(batch_id=batch.id, report=report))
+    db.flush()
+
+    rows = ReportRepository.aggregate_batch_reports(
+        db, batch.id, *split_stats_keys(OUTPUT_TYPES)
+    )
+
+    assert build_batch_stats(OUTPUT_TYPES, rows) == {
+        "lines": {"avg": 15.0},
+        "score": {"avg": 6.0},
+        "deployed": {
+            "distribution": {
+                "true": pytest.approx(200 / 3),
+                "false": pytest.approx(100 / 3),
+            }
+        },
+        "last_commit": {"avg": "2024-01-02 00:00:00"},
+    }
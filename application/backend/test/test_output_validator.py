@@ -0,0 +1,65 @@
+import pytest
+
+from schemas.shared import ValueTypesOutput
+from utils.validationUtils import OutputValidator
+
+RANGE = {"fromRange": 0, "toRange": 10}
+
+# (value type, extended metadata, value, accepted), matching what the
+# validate_report the validator replaced accepted
+CASES = [
+    (ValueTypesOutput.int, None, 5, True),
+    (ValueTypesOutput.int, None, None, True),
+    (ValueTypesOutput.int, None, "5", False),
+    (ValueTypesOutput.int, None, 5.5, False),
+    (ValueTypesOutput.int, None, {"value": 5, "desc": None}, True),
+    (ValueTypesOutput.int, None, {"value": "5", "desc": None}, True),
+    (ValueTypesOutput.int, None, {"value": "five", "desc": None}, False),
+    (ValueTypesOutput.int, None, {"value": 5}, False),
+    (ValueTypesOutput.bool, None, True, True),
+    (ValueTypesOutput.bool, None, 1, False),
+    (ValueTypesOutput.bool, None, "true", False),
+    (ValueTypesOutput.bool, None, {"value": True, "desc": "passed"}, True),
+    (ValueTypesOutput.bool, None, {"value": 1, "desc": None}, True),
+    (ValueTypesOutput.bool, None, {"value": "maybe", "desc": None}, False),
+    (ValueTypesOutput.str, None, "text", True),
+    (ValueTypesOutput.str, None, 1, False),
+    (ValueTypesOutput.str, None, {"value": "text", "desc": None}, True),
+    (ValueTypesOutput.str, None, {"value": 1, "desc": None}, False),
+    (ValueTypesOutput.range, RANGE, 5, True),
+    (ValueTypesOutput.range, RANGE, 0, True),
+    (ValueTypesOutput.range, RANGE, 10.0, True),
+    (ValueTypesOutput.range, RANGE, 11, False),
+    (ValueTypesOutput.range, RANGE, -1, False),
+    (ValueTypesOutput.range, RANGE, "5", False),
+    (ValueTypesOutput.range, RANGE, {"value": 5, "desc": None}, True),
+    (ValueTypesOutput.range, RANGE, {"value": 11, "desc": None}, False),
+    (ValueTypesOutput.range, '{"fromRange": 0, "toRange": 10}', 5, True),
+    (ValueTypesOutput.range, {"fromRange": 0}, 5, False),
+    (ValueTypesOutput.range, {}, 5, False),
+    (ValueTypesOutput.range, {}, None, True),
+    (ValueTypesOutput.date, None, "2024-01-01", True),
+    (ValueTypesOutput.date, None, 20240101, False),
+    (ValueTypesOutput.date, None, {"value": "2024-01-01T10:00:00", "desc": None}, True),
+    (ValueTypesOutput.date, None, {"value": "not a date", "desc": None}, False),
+]
+
+
+@pytest.mark.parametrize("value_type, extended_metadata, value, accepted", CASES)
+def test_value(value_type, extended_metadata, value, accepted):
+    validator = OutputValidator(
+        {"metric": {"value_type": value_type, "extended_metadata": extended_metadata}}
+    )
+
+    assert (validator.validate({"metric": value}) == []) == accepted
+
+
+def test_missing_and_unexpected_keys():
+    validator = OutputValidator(
+        {"metric": {"value_type": ValueTypesOutput.int, "extended_metadata": None}}
+    )
+
+    assert validator.validate({"other": 1}) == [
+        "Missing key: metric",
+        "Unexpected keys in report: other",
+    ]
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from db.crud.assignments_crud import AssignmentRepository
+from db.crud.batches_crud import BatchesRepository
+from db.crud.projects_crud import ProjectRepository
+from db.database import SessionLocal, engine
+from db.migrations import run_migrations
+
+
+@pytest.fixture(scope="module")
+def db():
+    try:
+        run_migrations(engine)
+    except OperationalError as e:
+        pytest.skip(f"Database not reachable: {e}")
+
+    db = SessionLocal()
+    # the test tables are tiny, so sequential scans would win on cost alone
+    db.connection().exec_driver_sql("SET LOCAL enable_seqscan = off")
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+
+def explain(db, call):
+    """
+    Runs the repository call and returns the plan of the last statement it sent
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = statements[-1]
+    rows = db.connection().exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    return "\n".join(row[0] for row in rows)
+
+
+def test_latest_batch_uses_composite_index(db):
+    plan = explain(
+        db,
+        lambda: BatchesRepository.get_latest_batch(db, assignment_id=1, analyzer_id=1),
+    )
+    assert "ix_batches_assignment_id_analyzer_id_timestamp" in plan
+
+
+def test_batch_report_lookup_uses_composite_index(db):
+    plan = explain(
+        db,
+        lambda: AssignmentRepository.get_assignment_team_projects_reports_batch(
+            db, assignment_id=1, team_id=1, batch_id=1
+        ),
+    )
+    assert "ix_reports_batch_id_project_id" in plan
+
+
+def test_project_metadata_uses_composite_index(db):
+    plan = explain(
+        db,
+        lambda: ProjectRepository.get_metadata_for_projects(
+            db, project_ids=[1, 2, 3], assignment_id=1, key_names=["repo"]
+        ),
+    )
+    assert "ix_project_metadata_project_id_assignment_metadata_id" in plan
@@ -0,0 +1,482 @@
+import hashlib
+import io
+import json
+import math
+import os
+import shlex
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import uuid4
+import docker
+from docker import DockerClient
+from docker.errors import APIError, ImageNotFound, NotFound
+from docker.utils import parse_bytes
+from docker.models.containers import Container
+from configs.config import settings
+
+
+IMAGE_REPOSITORY = "analyzer-app"
+IMAGE_HASH_LABEL = "flexilyzer.inputs-hash"
+POOL_LABEL = "flexilyzer.pool-key"
+SCRATCH_MOUNT = "/scratch"
+
+# timeout exits with 124 when the command timed out, and with 137 when it
+# had to be killed after the grace period. 137 is also the exit code of a
+# script killed for going over its memory limit.
+TIMEOUT_EXIT_CODE = 124
+KILLED_EXIT_CODE = 137
+TIMEOUT_KILL_GRACE = 5
+
+_client: Optional[DockerClient] = None
+_client_lock = threading.Lock()
+
+
+def get_docker_client() -> DockerClient:
+    """
+    Returns the docker client of this worker process, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = docker.from_env(max_pool_size=settings.DOCKER_CLIENT_POOL_SIZE)
+        return _client
+
+
+def get_image_inputs(analyzer_id: int):
+    """
+    Returns the files that make up an analyzer image, in a stable order.
+    The script itself is mounted at run time and is not part of the image.
+    """
+    return [
+        Path(settings.BASE_DIR) / "Dockerfile",
+        Path(settings.BASE_DIR + settings.SCRIPTS_FOLDER)
+        / str(analyzer_id)
+        / settings.DEFAULT_REQUIREMENTS_NAME,
+    ]
+
+
+def get_script_folder(analyzer_id: int) -> Path:
+    return (Path(settings.BASE_DIR + settings.SCRIPTS_FOLDER) / str(analyzer_id)).resolve()
+
+
+def compute_image_hash(analyzer_id: int) -> str:
+    """
+    Hashes the build inputs of an analyzer image, so analyzers with the same
+    requirements map to the same dependency image across batches.
+    """
+    hasher = hashlib.sha256()
+    for path in get_image_inputs(analyzer_id):
+        hasher.update(path.name.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(path.read_bytes())
+        hasher.update(b"\0")
+
+    return hasher.hexdigest()
+
+
+def get_analyzer_image(client: DockerClient, analyzer_id: int) -> str:
+    """
+    Returns the tag of an image matching the current analyzer requirements,
+    building it only if no such image exists yet.
+    """
+    inputs_hash = compute_image_hash(analyzer_id)
+    tag = f"{IMAGE_REPOSITORY}:{inputs_hash[:12]}"
+
+    try:
+        image = client.images.get(tag)
+        if image.labels.get(IMAGE_HASH_LABEL) == inputs_hash:
+            return tag
+    except ImageNotFound:
+        pass
+
+    client.images.build(
+        path=str(Path(settings.BASE_DIR).resolve()),
+        buildargs={"ANALYZER_ID": str(analyzer_id)},
+        tag=tag,
+        labels={IMAGE_HASH_LABEL: inputs_hash},
+        rm=True,
+    )
+
+    return tag
+
+
+def get_container_cpus(concurrency: int) -> Optional[float]:
+    """
+    Returns the CPUs of a container running `concurrency` execs at once,
+    ANALYZER_CPU_LIMIT per exec but no more than the host has.
+    """
+    if not settings.ANALYZER_CPU_LIMIT:
+        return None
+    return min(settings.ANALYZER_CPU_LIMIT * concurrency, os.cpu_count() or 1)
+
+
+def get_exec_timeout(timeout: int, concurrency: int) -> int:
+    """
+    Returns the timeout of an exec, stretched by how far the CPUs of its
+    container fall short of ANALYZER_CPU_LIMIT per exec.
+    """
+    cpus = get_container_cpus(concurrency)
+    if not cpus:
+        return timeout
+    shortfall = settings.ANALYZER_CPU_LIMIT * concurrency / cpus
+    return math.ceil(timeout * max(1.0, shortfall))
+
+
+def get_resource_limits(concurrency: int = 1) -> Dict:
+    """
+    Returns the cgroup limits of an analyzer container running `concurrency`
+    execs at once. The ANALYZER_*_LIMIT settings apply per exec, so the
+    container gets them times its concurrency.
+    """
+    limits = {}
+    cpus = get_container_cpus(concurrency)
+    if cpus:
+        limits["nano_cpus"] = int(cpus * 1e9)
+    if settings.ANALYZER_MEMORY_LIMIT:
+        memory = parse_bytes(settings.ANALYZER_MEMORY_LIMIT) * concurrency
+        limits["mem_limit"] = memory
+        # no swap on top of the memory limit
+        limits["memswap_limit"] = memory
+    if settings.ANALYZER_PIDS_LIMIT:
+        limits["pids_limit"] = settings.ANALYZER_PIDS_LIMIT * concurrency
+
+    return limits
+
+
+def get_scratch_mount(concurrency: int = 1) -> Dict:
+    """
+    Returns the RAM backed tmpfs holding the scratch directories of the execs
+    in a container, ANALYZER_SCRATCH_SIZE for each of its `concurrency` execs.
+    """
+    if not settings.ANALYZER_SCRATCH_SIZE:
+        return {}
+
+    size = parse_bytes(settings.ANALYZER_SCRATCH_SIZE) * concurrency
+    return {"tmpfs": {SCRATCH_MOUNT: f"size={size},mode=1777"}}
+
+
+def new_scratch_dir() -> str:
+    return f"{SCRATCH_MOUNT}/{uuid4().hex}"
+
+
+def in_scratch_dir(
+    command: str, scratch_dir: str, cleanup: Tuple[str, ...] = ()
+) -> str:
+    """
+    Wraps a shell command so it runs with a fresh scratch directory that is
+    removed afterwards, together with any `cleanup` paths, keeping the exit
+    code of the command.
+    """
+    paths = " ".join(shlex.quote(path) for path in [scratch_dir, *cleanup])
+    return (
+        f"mkdir -p {shlex.quote(scratch_dir)} && {command};"
+        f" code=$?; rm -rf {paths}; exit $code"
+    )
+
+
+def with_timeout(command: str, timeout: int) -> str:
+    """
+    Wraps a command with coreutils timeout, which sends SIGTERM after
+    `timeout` seconds and SIGKILL shortly after if the process is still alive.
+    """
+    return f"timeout --kill-after={TIMEOUT_KILL_GRACE} {timeout} {command}"
+
+
+def is_timeout_exit_code(exit_code: int, duration: float, timeout: int) -> bool:
+    """
+    A killed exec only counts as timed out if it ran for at least its timeout.
+    """
+    return exit_code == TIMEOUT_EXIT_CODE or (
+        exit_code == KILLED_EXIT_CODE and duration >= timeout
+    )
+
+
+def make_archive(name: str, content: bytes) -> bytes:
+    """
+    Returns a tar archive holding a single file, as expected by put_archive.
+    """
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        info = tarfile.TarInfo(name)
+        info.size = len(content)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(content))
+
+    return archive.getvalue()
+
+
+def put_file(container: Container, directory: str, name: str, content: bytes):
+    """
+    Writes a single file into a running container.
+    """
+    container.put_archive(directory, make_archive(name, content))
+
+
+class ExecOutput(NamedTuple):
+    exit_code: Optional[int]
+    # what the result is parsed from
+    output: bytes
+    # bounded copies of the streams, kept as the logs of the exec
+    stdout: bytes = b""
+    stderr: bytes = b""
+    # seconds the exec ran for
+    duration: float = 0.0
+
+
+class OutputCapture:
+    """
+    Collects one output stream of an exec with bounded memory. It keeps the
+    first `limit` bytes of the stream and its last line, also cut at `limit`
+    bytes, no matter how much the script writes.
+    """
+
+    def __init__(self, limit: int = settings.ANALYZER_OUTPUT_LIMIT):
+        self.limit = limit
+        self.head = bytearray()
+        self.size = 0
+        self.line = bytearray()
+        self.last_line = b""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Adds a chunk of the stream. Returns the non-empty lines it completed.
+        """
+        self.size += len(data)
+        self.head += data[: max(0, self.limit - len(self.head))]
+
+        *parts, rest = data.split(b"\n")
+        lines = []
+        for part in parts:
+            self._append(part)
+            if self.line.strip():
+                self.last_line = bytes(self.line)
+                lines.append(self.last_line)
+            self.line = bytearray()
+        self._append(rest)
+
+        return lines
+
+    def close(self) -> List[bytes]:
+        """
+        Ends the stream. Returns its last line if it was not terminated by a newline.
+        """
+        if not self.line.strip():
+            return []
+
+        self.last_line = bytes(self.line)
+        self.line = bytearray()
+        return [self.last_line]
+
+    @property
+    def truncated(self) -> bool:
+        return self.size > len(self.head)
+
+    @property
+    def output(self) -> bytes:
+        # the whole stream if it fit, otherwise only the last line
+        return self.last_line if self.truncated else bytes(self.head)
+
+    @property
+    def content(self) -> bytes:
+        if not self.truncated:
+            return bytes(self.head)
+        return bytes(self.head) + (
+            f"\n[{self.size - len(self.head)} more bytes truncated]".encode("utf-8")
+        )
+
+    def _append(self, part: bytes):
+        self.line += part[: max(0, self.limit - len(self.line))]
+
+
+def capture_exec(
+    container: Container,
+    command: List[str],
+    environment: Dict,
+    on_line: Optional[Callable[[bytes], None]] = None,
+) -> ExecOutput:
+    """
+    Runs a command in the container and streams its stdout and stderr into
+    bounded captures. If `on_line` is given it is called for every non-empty
+    stdout line as soon as the line arrives.
+    """
+    api = container.client.api
+    started = time.monotonic()
+    exec_id = api.exec_create(
+        container.id, command, environment=environment, stdout=True, stderr=True
+    )["Id"]
+
+    stdout, stderr = OutputCapture(), OutputCapture()
+    for out, err in api.exec_start(exec_id, stream=True, demux=True):
+        for line in stdout.feed(out) if out else []:
+            if on_line:
+                on_line(line)
+        if err:
+            stderr.feed(err)
+    for line in stdout.close():
+        if on_line:
+            on_line(line)
+    stderr.close()
+
+    return ExecOutput(
+        api.exec_inspect(exec_id)["ExitCode"],
+        stdout.output,
+        stdout.content,
+        stderr.content,
+        time.monotonic() - started,
+    )
+
+
+def kill_container(container: Container):
+    """
+    Kills a container and every exec running inside it.
+    """
+    try:
+        container.kill()
+    except (APIError, NotFound) as e:
+        print(e)
+
+
+def remove_container(container: Container):
+    try:
+        container.remove(force=True)
+    except (APIError, NotFound) as e:
+        print(e)
+
+
+class ContainerPool:
+    """
+    Keeps started analyzer containers around between batches so reruns can
+    skip container create/start/remove. Containers are keyed by image and
+    volumes, and removed once they have been idle for longer than
+    `idle_timeout` seconds or the pool holds more than `max_size` of them.
+    """
+
+    def __init__(self, max_size: int, idle_timeout: float):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[str, List[Tuple[Container, float]]] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    @staticmethod
+    def pool_key(image: str, volumes: Dict, concurrency: int) -> str:
+        return hashlib.sha256(
+            json.dumps([image, volumes, concurrency], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def acquire(
+        self, client: DockerClient, image: str, volumes: Dict, concurrency: int = 1
+    ) -> Container:
+        """
+        Borrows a running container for the image, sized for `concurrency`
+        execs at once, starting a new one if the pool has none available.
+        """
+        self._start_reaper()
+        key = self.pool_key(image, volumes, concurrency)
+
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                container, _ = idle.pop()
+
+            try:
+                container.reload()
+            except NotFound:
+                continue
+            if container.status == "running":
+                return container
+            remove_container(container)
+
+        container = client.containers.create(
+            image,
+            "tail -f /dev/null",
+            volumes=volumes,
+            labels={POOL_LABEL: key},
+            detach=True,
+            **get_resource_limits(concurrency),
+            **get_scratch_mount(concurrency),
+        )
+        container.start()
+        return container
+
+    def release(self, container: Container, healthy: bool = True):
+        """
+        Returns a borrowed container to the pool. Unhealthy containers and
+        containers beyond the pool size are removed instead.
+        """
+        if not healthy:
+            remove_container(container)
+            return
+
+        key = container.labels.get(POOL_LABEL)
+        with self._lock:
+            self._idle.setdefault(key, []).append((container, time.monotonic()))
+            overflow = self._pop_overflow()
+
+        for stale in overflow:
+            remove_container(stale)
+
+    def evict_idle(self):
+        """
+        Removes containers that have not been borrowed within the idle timeout.
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        expired = []
+
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                expired += [c for c, last_used in idle if last_used < deadline]
+                self._idle[key] = [(c, t) for c, t in idle if t >= deadline]
+                if not self._idle[key]:
+                    del self._idle[key]
+
+        for container in expired:
+            remove_container(container)
+
+    def drain(self):
+        """
+        Removes every idle container, e.g. when the worker shuts down.
+        """
+        with self._lock:
+            containers = [c for idle in self._idle.values() for c, _ in idle]
+            self._idle.clear()
+
+        for container in containers:
+            remove_container(container)
+
+    def _pop_overflow(self) -> List[Container]:
+        entries = sorted(
+            ((t, key, c) for key, idle in self._idle.items() for c, t in idle),
+            key=lambda entry: entry[0],
+        )
+        overflow = entries[: max(0, len(entries) - self.max_size)]
+
+        for _, key, container in overflow:
+            self._idle[key] = [(c, t) for c, t in self._idle[key] if c is not container]
+            if not self._idle[key]:
+                del self._idle[key]
+
+        return [container for _, _, container in overflow]
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(max(1.0, self.idle_timeout / 2))
+            self.evict_idle()
+
+
+container_pool = ContainerPool(
+    max_size=settings.CONTAINER_POOL_MAX_SIZE,
+    idle_timeout=settings.CONTAINER_POOL_IDLE_TIMEOUT,
+)
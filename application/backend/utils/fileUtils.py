@@ -1,8 +1,27 @@
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
+from uuid import uuid4
+from collections import OrderedDict
+import hashlib
+import os
+import shutil
+import time
+import zipfile
 import aiofiles
 from configs.config import settings
 
+# file hashes by (path, mtime, size), so unchanged files are only read once,
+# bounded to the FILE_HASH_CACHE_SIZE most recently used files
+FILE_HASH_CACHE_SIZE = 10000
+_file_hashes = OrderedDict()
+
+# when this process last evicted unused deliveries from the delivery cache
+_last_eviction = 0.0
+
+
+class DeliveryTooLargeError(Exception):
+    pass
+
 
 def create_if_not_exists(path: Path):
     return path.mkdir(parents=True, exist_ok=True)
@@ -28,6 +47,107 @@ async def store_file(analyzer_id: int, file: UploadFile, requirements: bool = Fa
         raise HTTPException(status_code=500, detail="File storage failed.")
 
 
+def hash_file(path: Path) -> str:
+    """
+    Returns the sha256 of a file, reusing the previous hash while the file's
+    modification time and size are unchanged.
+    """
+    stat = path.stat()
+    cache_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    if cache_key in _file_hashes:
+        _file_hashes.move_to_end(cache_key)
+        return _file_hashes[cache_key]
+
+    hasher = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            hasher.update(chunk)
+    _file_hashes[cache_key] = hasher.hexdigest()
+    if len(_file_hashes) > FILE_HASH_CACHE_SIZE:
+        _file_hashes.popitem(last=False)
+
+    return _file_hashes[cache_key]
+
+
+def check_zip_size(zip_ref: zipfile.ZipFile):
+    """
+    Refuses zips, e.g. zip bombs, that would extract to more than
+    DELIVERY_MAX_SIZE bytes or DELIVERY_MAX_FILES files. Extraction never
+    reads past the size a member declares, so the declared sizes are a bound.
+    """
+    members = zip_ref.infolist()
+    if len(members) > settings.DELIVERY_MAX_FILES:
+        raise DeliveryTooLargeError(
+            f"Delivery has {len(members)} files, "
+            f"at most {settings.DELIVERY_MAX_FILES} are extracted"
+        )
+
+    size = sum(member.file_size for member in members)
+    if size > settings.DELIVERY_MAX_SIZE:
+        raise DeliveryTooLargeError(
+            f"Delivery extracts to {size} bytes, "
+            f"at most {settings.DELIVERY_MAX_SIZE} are extracted"
+        )
+
+
+def evict_delivery_cache(cache_dir: Path, max_age: float):
+    """
+    Removes extracted deliveries that have not been used for `max_age`
+    seconds. extract_delivery touches a delivery every time it is used.
+    """
+    deadline = time.time() - max_age
+    for entry in cache_dir.iterdir():
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < deadline:
+                shutil.rmtree(entry, ignore_errors=True)
+        except OSError as e:
+            print(e)
+
+
+def extract_delivery(zip_path: Path) -> str:
+    """
+    Extracts a delivery zip into the delivery cache, once per distinct zip
+    content. Returns the content hash, which is the name of the extracted folder.
+    Deliveries unused for DELIVERY_CACHE_MAX_AGE seconds are evicted, checked
+    at most once per DELIVERY_CACHE_EVICT_INTERVAL seconds in each worker.
+    """
+    global _last_eviction
+
+    content_hash = hash_file(zip_path)
+    cache_dir = Path(settings.BASE_DIR + settings.DELIVERY_CACHE_FOLDER)
+    target = cache_dir / content_hash
+
+    if time.monotonic() - _last_eviction >= settings.DELIVERY_CACHE_EVICT_INTERVAL:
+        _last_eviction = time.monotonic()
+        evict_delivery_cache(cache_dir, settings.DELIVERY_CACHE_MAX_AGE)
+
+    try:
+        # marks the delivery as used, so it is not evicted
+        os.utime(target)
+        return content_hash
+    except FileNotFoundError:
+        pass
+
+    # extract next to the target and rename, so concurrent workers never see
+    # a partially extracted folder
+    tmp_target = cache_dir / f".{content_hash}-{uuid4().hex}"
+    create_if_not_exists(tmp_target)
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            check_zip_size(zip_ref)
+            zip_ref.extractall(tmp_target)
+        os.rename(tmp_target, target)
+    except OSError:
+        # another worker extracted the same content first
+        if not target.is_dir():
+            raise
+    finally:
+        shutil.rmtree(tmp_target, ignore_errors=True)
+
+    return content_hash
+
+
 def script_exists(analyzer_id: int, requirements: bool = False):
     file_path = (
         Path(settings.BASE_DIR + settings.SCRIPTS_FOLDER)
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+from schemas.shared import ValueTypesOutput
+
+NUMBER_TYPES = [ValueTypesOutput.int, ValueTypesOutput.range]
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def split_stats_keys(
+    output_types: Dict[str, ValueTypesOutput]
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Splits the outputs into the keys averaged as numbers, the keys averaged as
+    dates and the keys counted as booleans. Other outputs have no stats.
+    """
+    number_keys = [key for key, t in output_types.items() if t in NUMBER_TYPES]
+    date_keys = [key for key, t in output_types.items() if t == ValueTypesOutput.date]
+    bool_keys = [key for key, t in output_types.items() if t == ValueTypesOutput.bool]
+    return number_keys, date_keys, bool_keys
+
+
+def build_batch_stats(
+    output_types: Dict[str, ValueTypesOutput], rows: Iterable[Tuple]
+) -> Dict[str, Dict]:
+    """
+    Shapes the aggregated rows of ReportRepository.aggregate_batch_reports into
+    the stats of a batch: the average of int, range and date outputs, and the
+    true/false distribution in percent of bool outputs.
+    """
+    aggregates = {row[0]: row[1:] for row in rows}
+
+    stats = {}
+    for key, value_type in output_types.items():
+        avg_number, avg_epoch, true_count, false_count = aggregates.get(
+            key, (None, None, 0, 0)
+        )
+
+        if value_type in NUMBER_TYPES:
+            stats[key] = {"avg": float(avg_number) if avg_number is not None else None}
+        elif value_type == ValueTypesOutput.date:
+            stats[key] = {
+                "avg": str(EPOCH + timedelta(seconds=float(avg_epoch)))
+                if avg_epoch is not None
+                else None
+            }
+        elif value_type == ValueTypesOutput.bool:
+            total = true_count + false_count
+            if not total:
+                stats[key] = {"distribution": {"true": None, "false": None}}
+                continue
+            true_percentage = true_count / total * 100
+            stats[key] = {
+                "distribution": {"true": true_percentage, "false": 100 - true_percentage}
+            }
+
+    return stats
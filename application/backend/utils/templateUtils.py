@@ -1,6 +1,6 @@
 from typing import List, Set, Tuple
 from schemas.analyzer_schema import AnalyzerInputCreate, AnalyzerOutputCreate
-from schemas.shared import ValueTypesMapping, ValueTypesOutput, ExtendedTypeMappings, ValueTypesInput
+from schemas.shared import ValueTypesMapping, ValueTypesOutput, ExtendedTypeMappings, ValueTypesInput, AnalyzerProtocolEnum, PROTOCOL_ENV_VAR, PROTOCOL_ERROR_KEY, PROTOCOL_ID_KEY, SCRATCH_ENV_VAR
 
 
 
@@ -25,12 +25,19 @@ class {extended_class_name.value}(BaseModel):
     return needed_extended_types, extended_classes
 
 def generate_env_vars(inputs: List[AnalyzerInputCreate]) -> str:
-    env_vars = "\n    ".join([
+    env_vars = "\n        ".join([
         f"{input.key_name} = {ValueTypesMapping[ValueTypesInput[input.value_type.value].name].value}(os.getenv('{input.key_name.upper()}'))"
         for input in inputs
     ])
     return env_vars
 
+def generate_jsonl_vars(inputs: List[AnalyzerInputCreate]) -> str:
+    jsonl_vars = "\n                    ".join([
+        f"{input.key_name} = {ValueTypesMapping[ValueTypesInput[input.value_type.value].name].value}(inputs.get('{input.key_name.upper()}'))"
+        for input in inputs
+    ])
+    return jsonl_vars
+
 def generate_template(inputs: List[AnalyzerInputCreate], outputs: List[AnalyzerOutputCreate]) -> str:
     input_params = get_input_params(inputs)
     needed_extended_types, extended_classes = get_extended_types_and_classes(outputs)
@@ -43,8 +50,10 @@ def generate_template(inputs: List[AnalyzerInputCreate], outputs: List[AnalyzerO
     output_class = f"{extended_classes}\nclass Return(BaseModel):\n    {output_class_fields}" if outputs else ""
 
     env_vars = generate_env_vars(inputs)
+    jsonl_vars = generate_jsonl_vars(inputs)
+    main_args = ', '.join([input.key_name for input in inputs])
 
-    imports = "import os\nfrom typing import Optional\nfrom pydantic import BaseModel\n"
+    imports = "import os\nimport sys\nimport json\nimport shutil\nimport contextlib\nfrom typing import Optional\nfrom pydantic import BaseModel\n"
     if 'datetime' in needed_extended_types:
         imports += "from datetime import datetime\n"
     if any(input.value_type.value == 'zip' for input in inputs):
@@ -58,7 +67,28 @@ def main({input_params}) -> {'Return' if outputs else 'None'}:
     return
 
 if __name__ == "__main__":
-    {env_vars}
-    print(main({', '.join([input.key_name for input in inputs])}).model_dump_json())  
+    if os.getenv("{PROTOCOL_ENV_VAR}") == "{AnalyzerProtocolEnum.jsonl.value}":
+        # jsonl protocol: one JSON object of inputs per line on stdin,
+        # answered with one JSON result per line on stdout. The result must
+        # repeat the "{PROTOCOL_ID_KEY}" of its inputs, other lines are ignored
+        for line in sys.stdin:
+            project_id = None
+            try:
+                # keeps what main prints out of the results
+                with contextlib.redirect_stdout(sys.stderr):
+                    inputs = json.loads(line)
+                    project_id = inputs.get("{PROTOCOL_ID_KEY}")
+                    {jsonl_vars}
+                    result = main({main_args}).model_dump(mode="json")
+            except Exception as e:
+                result = {{"{PROTOCOL_ERROR_KEY}": str(e)}}
+            finally:
+                # start every project with an empty scratch directory
+                shutil.rmtree(os.environ["{SCRATCH_ENV_VAR}"], ignore_errors=True)
+                os.makedirs(os.environ["{SCRATCH_ENV_VAR}"], exist_ok=True)
+            print(json.dumps({{**result, "{PROTOCOL_ID_KEY}": project_id}}), flush=True)
+    else:
+        {env_vars}
+        print(main({main_args}).model_dump_json())
 """
     return template
\ No newline at end of file
@@ -1,7 +1,10 @@
 from types import NoneType
+from typing import Callable, Dict, List, Optional
 from fastapi import HTTPException
 from pydantic import ValidationError
+import hashlib
 import json
+import threading
 from schemas.shared import (
     ValueTypesOutput,
     ExtendedBool,
@@ -9,7 +12,6 @@ from schemas.shared import (
     ExtendedInt,
     ExtendedStr,
 )
-from datetime import datetime
 
 
 def validatePydanticToHTTPError(schema, to_validate):
@@ -25,114 +27,161 @@ def validatePydanticToHTTPError(schema, to_validate):
         raise HTTPException(status_code=400, detail=simplified_errors)
 
 
-def cast_to_pydantic(value, type):
-    try:
-        type(**value)
-        return True
-    except Exception:
-        return False
-
-
 def value_inside_range(value, from_range, to_range):
     return from_range <= value <= to_range
 
 
-def validate_type(key, value, expected_type, extended_metadata=None):
+# check of one output value, returning an error message or None
+ValueCheck = Callable[[str, object], Optional[str]]
+
+# plain value checks per output type
+_VALUE_CHECKS = {
+    ValueTypesOutput.int: lambda value: isinstance(value, int),
+    ValueTypesOutput.bool: lambda value: isinstance(value, bool),
+    ValueTypesOutput.str: lambda value: isinstance(value, str),
+}
+# the extended form {"value", "desc"} is validated by its pydantic model, so
+# its value gets pydantic's lax conversion, like "5" for an int
+_EXTENDED_MODELS = {
+    ValueTypesOutput.int: ExtendedInt,
+    ValueTypesOutput.bool: ExtendedBool,
+    ValueTypesOutput.str: ExtendedStr,
+    ValueTypesOutput.range: ExtendedInt,
+    ValueTypesOutput.date: ExtendedDatetime,
+}
+
+
+def _as_extended(value, model):
     """
-    Validate the type of a value against the expected type, including handling ranges as a distinct case.
-    Also ensures extended_metadata is a dictionary and provides detailed error messages.
+    Returns the value validated as the extended model, or None if it is not one.
     """
-    # Prepare a base error message component for type mismatches
-    base_error_msg = f"Incorrect type for key '{key}'. Expected {expected_type}"
+    if not isinstance(value, dict):
+        return None
+    try:
+        return model.model_validate(value)
+    except ValidationError:
+        return None
+
 
+def compile_value_check(expected_type, extended_metadata=None) -> ValueCheck:
+    """
+    Compiles the output spec of one key into a check function, doing the
+    work that does not depend on the value, like decoding the range bounds, once.
+    """
     if isinstance(extended_metadata, str):
         try:
             extended_metadata = json.loads(extended_metadata)
         except json.JSONDecodeError:
-            print(f"Error decoding extended_metadata for key {key}")
-            return False, "Error decoding extended_metadata"
+            return lambda key, value: "Error decoding extended_metadata"
 
-    if isinstance(value, NoneType):
-        return True, ""
+    def type_error(key, value):
+        return f"Incorrect type for key '{key}'. Expected {expected_type}, got {type(value).__name__}"
 
     if expected_type == ValueTypesOutput.range:
-        if "fromRange" in extended_metadata and "toRange" in extended_metadata:
-            from_range = extended_metadata["fromRange"]
-            to_range = extended_metadata["toRange"]
-        else:
-            return False, "Missing range definitions in metric metadata"
-
-        if isinstance(value, (int, float)) and value_inside_range(
-            value, from_range, to_range
+        if not extended_metadata or not (
+            "fromRange" in extended_metadata and "toRange" in extended_metadata
         ):
-            return True, ""
-        elif cast_to_pydantic(value, ExtendedInt) and value_inside_range(
-            value["value"], from_range, to_range
+            return lambda key, value: (
+                None if value is None else "Missing range definitions in metric metadata"
+            )
+        from_range = extended_metadata["fromRange"]
+        to_range = extended_metadata["toRange"]
+
+        def check_range(key, value):
+            number = value
+            extended = _as_extended(value, _EXTENDED_MODELS[expected_type])
+            if extended:
+                number = extended.value
+            elif not isinstance(value, (int, float, NoneType)):
+                return type_error(key, value)
+            if number is None or value_inside_range(number, from_range, to_range):
+                return None
+            return type_error(key, value)
+
+        return check_range
+
+    if expected_type == ValueTypesOutput.date:
+        # plain dates are only required to be strings
+        value_check = _VALUE_CHECKS[ValueTypesOutput.str]
+    elif expected_type in _VALUE_CHECKS:
+        value_check = _VALUE_CHECKS[expected_type]
+    else:
+        return lambda key, value: f"Unknown or unsupported type, {key} - {value}"
+    extended_model = _EXTENDED_MODELS[expected_type]
+
+    def check(key, value):
+        if (
+            value is None
+            or value_check(value)
+            or _as_extended(value, extended_model)
         ):
-            return True, ""
-        else:
-            return False, f"{base_error_msg}, got {type(value).__name__}"
-
-    elif expected_type == ValueTypesOutput.int:
-        if isinstance(value, int):
-            return True, ""
-        elif cast_to_pydantic(value, ExtendedInt):
-            return True, ""
-        else:
-            return False, f"{base_error_msg}, got {type(value).__name__}"
-
-    elif expected_type == ValueTypesOutput.bool:
-        if isinstance(value, bool):
-            return True, ""
-        elif cast_to_pydantic(value, ExtendedBool):
-            return True, ""
-        else:
-            return False, f"{base_error_msg}, got {type(value).__name__}"
-
-    elif expected_type == ValueTypesOutput.str:
-        if isinstance(value, str):
-            return True, ""
-        elif cast_to_pydantic(value, ExtendedStr):
-            return True, ""
-        else:
-            return False, f"{base_error_msg}, got {type(value).__name__}"
-
-    elif expected_type == ValueTypesOutput.date:
-        if isinstance(value, str):
-            return True, ""
-        elif cast_to_pydantic(value, ExtendedDatetime):
-            return True, ""
-        else:
-            return False, f"{base_error_msg}, got {type(value).__name__}"
+            return None
+        return type_error(key, value)
 
-    else:
-        print(type(key))
-        print(type(expected_type))
-        return False, f"Unknown or unsupported type, {key} - {value}"
+    return check
 
 
-def validate_report(report, required_outputs):
+class OutputValidator:
     """
-    Validate the report against the required outputs, including handling extended metadata.
-    Enhances error messages for range violations.
+    Validates reports against the output spec of one analyzer. The spec is
+    compiled once into a check per key, so validating a report does no
+    decoding or model building.
     """
-    errors = []
 
-    for key, specs in required_outputs.items():
-        if key not in report:
-            errors.append(f"Missing key: {key}")
-            continue
+    def __init__(self, required_outputs: Dict[str, Dict]):
+        self.checks: Dict[str, ValueCheck] = {
+            key: compile_value_check(
+                specs["value_type"], specs.get("extended_metadata")
+            )
+            for key, specs in required_outputs.items()
+        }
 
-        valid, error_message = validate_type(
-            key, report[key], specs["value_type"], specs.get("extended_metadata")
-        )
+    def validate(self, report) -> List[str]:
+        errors = []
+
+        for key, check in self.checks.items():
+            if key not in report:
+                errors.append(f"Missing key: {key}")
+                continue
+
+            error_message = check(key, report[key])
+            if error_message:
+                errors.append(error_message)
+
+        # Check for extra keys in the report
+        extra_keys = report.keys() - self.checks.keys()
+        if extra_keys:
+            errors.append(f"Unexpected keys in report: {', '.join(extra_keys)}")
+
+        return errors
+
+
+# compiled validators by analyzer id, with the fingerprint of the outputs
+# they were compiled from
+_output_validators: Dict[int, tuple] = {}
+_output_validators_lock = threading.Lock()
+
+
+def outputs_fingerprint(required_outputs: Dict[str, Dict]) -> str:
+    return hashlib.sha256(
+        json.dumps(required_outputs, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def get_output_validator(analyzer_id: int, required_outputs) -> OutputValidator:
+    """
+    Returns the compiled validator of an analyzer, compiling it again only
+    if the outputs changed since it was cached.
+    """
+    fingerprint = outputs_fingerprint(required_outputs)
 
-        if not valid:
-            errors.append(error_message)
+    with _output_validators_lock:
+        cached = _output_validators.get(analyzer_id)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
 
-    # Check for extra keys in the report
-    extra_keys = set(report.keys()) - set(required_outputs.keys())
-    if extra_keys:
-        errors.append(f"Unexpected keys in report: {', '.join(extra_keys)}")
+    validator = OutputValidator(required_outputs)
+    with _output_validators_lock:
+        _output_validators[analyzer_id] = (fingerprint, validator)
 
-    return errors
+    return validator
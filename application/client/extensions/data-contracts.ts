@@ -139,6 +139,7 @@ export enum BatchEnum {
   RUNNING = "RUNNING",
   FAILED = "FAILED",
   FINISHED = "FINISHED",
+  CANCELLED = "CANCELLED",
 }
 
 /** BatchResponse */